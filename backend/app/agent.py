@@ -10,15 +10,34 @@ The agent:
 
 import logging
 import os
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Sequence
+from contextlib import aclosing
 
+from app.eventlog import event_log
+from app.mcp_client import TOOL_PROGRESS_EVENT
+from app.resilience import TOOL_ERROR_EVENT, ResilienceMiddleware, available_tools
+from app.tokens import (
+    BudgetExceededError,
+    MessageTokenCounter,
+    TokenUsage,
+    client_budgets,
+    content_text,
+    count_message_tokens,
+)
+from app.trimming import ToolOutputTrimmer, read_tool_output
 from langchain.agents import create_agent
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
 from langchain_core.tools import BaseTool
 from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 logger = logging.getLogger(__name__)
 
+# Tool outputs longer than this are sent to the client as ``tool_progress`` chunks.
+TOOL_RESULT_CHUNK_CHARS = int(os.getenv("TOOL_RESULT_CHUNK_CHARS", "4000"))
+
+
 # ── System prompt ──────────────────────────────────────────────────────────────
 
 SYSTEM_PROMPT = """You are a helpful AI assistant with access to a set of tools \
@@ -51,10 +70,15 @@ def _build_llm() -> ChatHuggingFace:
 # ── Agent factory ──────────────────────────────────────────────────────────────
 
 
-def build_agent(tools: list[BaseTool]):
+def build_agent(
+    tools: list[BaseTool],
+    checkpointer: BaseCheckpointSaver | None = None,
+    middleware: Sequence[AgentMiddleware] = (),
+):
     """
     Create a LangGraph ReAct agent pre-loaded with *tools*.
     If *tools* is empty the agent still works — it answers from knowledge only.
+    Pass a *checkpointer* to persist the graph state between steps.
     """
     llm = _build_llm()
 
@@ -62,7 +86,8 @@ def build_agent(tools: list[BaseTool]):
         model=llm,
         tools=tools,
         system_prompt=SYSTEM_PROMPT,
-        checkpointer=None,
+        middleware=middleware,
+        checkpointer=checkpointer,
     )
     return agent
 
@@ -73,24 +98,119 @@ def build_agent(tools: list[BaseTool]):
 async def run_agent_stream(
     query: str,
     tools: list[BaseTool],
+    *,
+    checkpointer: BaseCheckpointSaver | None = None,
+    thread_id: str | None = None,
+    resume: bool = False,
+    client_id: str = "anonymous",
 ) -> AsyncIterator[dict]:
     """
     Run the ReAct agent and yield structured streaming events.
 
+    With a *checkpointer* and *thread_id* every graph step is persisted; set
+    *resume* to continue that thread from its last checkpoint instead of
+    starting over with *query*.
+
+    Prompt and completion tokens are counted locally for every model call and
+    checked against the per-request budget and *client_id*'s budget.
+
     Each yielded dict has:
         {
-            "type":    "thinking" | "tool_call" | "tool_result" | "answer" | "error",
+            "type":    "thinking" | "tool_call" | "tool_progress" | "tool_result"
+                       | "answer" | "error",
             "content": str | dict,
         }
+
+    A tool call that fails, or is rejected by an open circuit breaker (no
+    ``tool_call`` precedes it then), ends with a ``tool_result`` whose
+    ``status`` is ``"error"``.
+
+    ``tool_progress`` carries either an MCP progress notification
+    (``progress``/``total``/``message``) while the tool runs, or one chunk of a
+    large tool output (``chunk``/``chunks``/``output``). Chunked results end
+    with a ``tool_result`` whose ``output`` is empty and ``chunks`` is set.
+
+    ``tool_call`` and ``tool_result`` events carry the tool run's ``"run_id"``,
+    so concurrent calls of one tool can be told apart. The ``answer`` event
+    additionally carries ``"usage"`` with the token counts.
+
+    Every event is also recorded, with timings, in the compact event log.
     """
-    agent = build_agent(tools)
+    recorder = event_log.recorder()
+    events = _agent_events(
+        query,
+        tools,
+        checkpointer=checkpointer,
+        thread_id=thread_id,
+        resume=resume,
+        client_id=client_id,
+    )
+    async with aclosing(events):
+        async for event in events:
+            recorder.record(event)
+            yield event
+
+
+async def _agent_events(
+    query: str,
+    tools: list[BaseTool],
+    *,
+    checkpointer: BaseCheckpointSaver | None,
+    thread_id: str | None,
+    resume: bool,
+    client_id: str,
+) -> AsyncIterator[dict]:
+    usage = TokenUsage()
+    prompt_counter = MessageTokenCounter()
+    # Fast fallback: tools behind an open circuit breaker are left out, so a
+    # degraded MCP server makes the agent answer from knowledge instead of
+    # waiting on timeouts.
+    healthy = available_tools(tools)
+    if len(healthy) < len(tools):
+        logger.warning(
+            "Skipping %d tool(s) with open circuit breakers.", len(tools) - len(healthy)
+        )
+    agent = build_agent(
+        [*healthy, read_tool_output] if healthy else [],
+        checkpointer,
+        middleware=[
+            ResilienceMiddleware(t.name for t in healthy),
+            ToolOutputTrimmer(usage),
+        ],
+    )
     messages: list[BaseMessage] = [HumanMessage(content=query)]
+    inputs = None if resume else {"messages": messages}
+    config = {"configurable": {"thread_id": thread_id}} if thread_id else None
 
     try:
-        async for event in agent.astream_events({"messages": messages}, version="v2"):
+        if client_budgets.remaining(client_id) == 0:
+            raise BudgetExceededError(f"Token budget exhausted for client {client_id}.")
+
+        async for event in agent.astream_events(inputs, config, version="v2"):
             kind = event.get("event")
             data = event.get("data", {})
             name = event.get("name", "")
+            run_id = event.get("run_id")
+
+            # ── Token accounting ───────────────────────────────────────────────
+            if kind == "on_chat_model_start":
+                usage.model_calls += 1
+                tokens = sum(
+                    prompt_counter.count(prompt)
+                    for prompt in data.get("input", {}).get("messages", [])
+                )
+                usage.prompt_tokens += tokens
+                _charge(usage, client_id, tokens)
+
+            elif kind == "on_chat_model_end":
+                output = data.get("output")
+                tokens = (
+                    count_message_tokens([output])
+                    if isinstance(output, BaseMessage)
+                    else 0
+                )
+                usage.completion_tokens += tokens
+                _charge(usage, client_id, tokens)
 
             # ── LLM streaming token ────────────────────────────────────────────
             if kind == "on_chat_model_stream":
@@ -111,17 +231,54 @@ async def run_agent_stream(
                         "tool": name,
                         "input": data.get("input", {}),
                     },
+                    "run_id": run_id,
                 }
 
-            # ── Tool result ────────────────────────────────────────────────────
-            elif kind == "on_tool_end":
-                output = data.get("output")
+            # ── Tool progress (MCP progress notification) ─────────────────────
+            elif kind == "on_custom_event" and name == TOOL_PROGRESS_EVENT:
+                yield {"type": "tool_progress", "content": data}
+
+            # ── Tool failure (raised, or rejected by a circuit breaker) ────────
+            elif kind == "on_tool_error":
                 yield {
                     "type": "tool_result",
                     "content": {
                         "tool": name,
-                        "output": output if output is not None else "",
+                        "output": f"Tool call failed: {data.get('error')}",
+                        "status": "error",
                     },
+                    "run_id": run_id,
+                }
+
+            elif kind == "on_custom_event" and name == TOOL_ERROR_EVENT:
+                yield {"type": "tool_result", "content": data}
+
+            # ── Tool result ────────────────────────────────────────────────────
+            elif kind == "on_tool_end":
+                output = _output_text(data.get("output"))
+                if len(output) <= TOOL_RESULT_CHUNK_CHARS:
+                    yield {
+                        "type": "tool_result",
+                        "content": {"tool": name, "output": output},
+                        "run_id": run_id,
+                    }
+                    continue
+
+                chunks = range(0, len(output), TOOL_RESULT_CHUNK_CHARS)
+                for i, start in enumerate(chunks):
+                    yield {
+                        "type": "tool_progress",
+                        "content": {
+                            "tool": name,
+                            "chunk": i,
+                            "chunks": len(chunks),
+                            "output": output[start : start + TOOL_RESULT_CHUNK_CHARS],
+                        },
+                    }
+                yield {
+                    "type": "tool_result",
+                    "content": {"tool": name, "output": "", "chunks": len(chunks)},
+                    "run_id": run_id,
                 }
 
             # ── Final answer emitted by the graph ─────────────────────────────
@@ -136,8 +293,34 @@ async def run_agent_stream(
                             if isinstance(last.content, str)
                             else str(last.content)
                         )
-                        yield {"type": "answer", "content": content}
+                        yield {
+                            "type": "answer",
+                            "content": content,
+                            "usage": usage.as_dict(),
+                        }
 
+    except BudgetExceededError as exc:
+        logger.warning("%s Usage: %s", exc, usage.as_dict())
+        yield {"type": "error", "content": str(exc), "usage": usage.as_dict()}
     except Exception as exc:
         logger.exception("Agent error: %s", exc)
         yield {"type": "error", "content": str(exc)}
+
+
+def _output_text(output) -> str:
+    if output is None:
+        return ""
+    if isinstance(output, ToolMessage):
+        return content_text(output.content)
+    return output if isinstance(output, str) else str(output)
+
+
+def _charge(usage: TokenUsage, client_id: str, tokens: int) -> None:
+    """Charge one model call to *client_id* and enforce both budgets."""
+    client_remaining = client_budgets.charge(client_id, tokens)
+    if usage.remaining() == 0:
+        raise BudgetExceededError(
+            f"Request token budget exceeded ({usage.total_tokens} tokens)."
+        )
+    if client_remaining == 0:
+        raise BudgetExceededError("Client token budget exceeded.")
@@ -0,0 +1,242 @@
+"""
+Offline analytics over the compact event log written by ``app.eventlog``.
+
+Files are read block by block and folded into fixed-size NumPy aggregates
+(log-spaced latency histograms, step-count bins, per-tool counters), so memory
+stays bounded however many events the logs hold. Percentiles are read off the
+histograms and are accurate to one bin (~7 %).
+
+Usage:
+    python -m app.analytics [LOG_DIR] [--json]
+"""
+
+import argparse
+import json
+import logging
+from collections import Counter
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+from app.eventlog import (
+    COLUMNS,
+    EVENT_LOG_DIR,
+    FLAG_CACHE_HIT,
+    FLAG_CACHE_MISS,
+    HEADER,
+    KINDS,
+    MAGIC,
+)
+
+logger = logging.getLogger(__name__)
+
+# 240 log-spaced bins from 1 ms to 1 h.
+LATENCY_EDGES = np.logspace(-3, np.log10(3600), 241)
+MAX_STEPS = 64
+PERCENTILES = (50, 90, 95, 99)
+
+_DTYPES = [(name, np.dtype(dtype)) for name, _, dtype in COLUMNS]
+_KIND = {kind: code for code, kind in enumerate(KINDS)}
+
+
+def read_blocks(path: Path) -> Iterator[tuple[list[str], dict[str, np.ndarray]]]:
+    """Yield ``(tool_names, columns)`` for every complete block in *path*."""
+    with path.open("rb") as f:
+        while header := f.read(HEADER.size):
+            if len(header) < HEADER.size:
+                logger.warning("%s: truncated block header, stopping.", path)
+                return
+            magic, n, names_len = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not an event log block ({magic!r}).")
+            table = f.read(names_len).decode()
+            columns = {}
+            for name, dtype in _DTYPES:
+                raw = f.read(n * dtype.itemsize)
+                if len(raw) < n * dtype.itemsize:
+                    logger.warning("%s: truncated block, stopping.", path)
+                    return
+                columns[name] = np.frombuffer(raw, dtype=dtype)
+            yield (table.split("\n") if table else []), columns
+
+
+# ── Aggregates ─────────────────────────────────────────────────────────────────
+
+
+class LatencyHistogram:
+    """Fixed-bin latency histogram; bin 0 / the last bin catch under/overflow."""
+
+    def __init__(self) -> None:
+        self.counts = np.zeros(len(LATENCY_EDGES) + 1, dtype=np.int64)
+        self.total = 0
+        self.sum = 0.0
+
+    def add(self, seconds: np.ndarray) -> None:
+        seconds = seconds[~np.isnan(seconds)]
+        if not seconds.size:
+            return
+        bins = np.searchsorted(LATENCY_EDGES, seconds, side="right")
+        self.counts += np.bincount(bins, minlength=self.counts.size)
+        self.total += seconds.size
+        self.sum += float(seconds.sum(dtype=np.float64))
+
+    def percentile(self, q: float) -> float | None:
+        if not self.total:
+            return None
+        i = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.total))
+        return float(LATENCY_EDGES[min(i, len(LATENCY_EDGES) - 1)])
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else None,
+            **{f"p{q}": self.percentile(q) for q in PERCENTILES},
+        }
+
+
+class Report:
+    def __init__(self) -> None:
+        self.files = 0
+        self.kinds = np.zeros(len(KINDS), dtype=np.int64)
+        self.steps = np.zeros(MAX_STEPS + 1, dtype=np.int64)
+        self.run_latency = LatencyHistogram()
+        self.tool_latency: dict[str, LatencyHistogram] = {}
+        self.tool_calls: Counter[str] = Counter()
+        self.tokens = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.first_ts: float | None = None
+        self.last_ts: float | None = None
+
+    def add_block(self, names: list[str], c: dict[str, np.ndarray]) -> None:
+        kind = c["kind"]
+        if not kind.size:
+            return
+        self.kinds += np.bincount(kind, minlength=len(KINDS))[: len(KINDS)]
+        ts_min, ts_max = float(c["ts"].min()), float(c["ts"].max())
+        self.first_ts = ts_min if self.first_ts is None else min(self.first_ts, ts_min)
+        self.last_ts = ts_max if self.last_ts is None else max(self.last_ts, ts_max)
+
+        finished = (kind == _KIND["answer"]) | (kind == _KIND["error"])
+        self.run_latency.add(c["duration"][finished].astype(np.float64))
+        steps = np.minimum(c["step"][finished], MAX_STEPS)
+        self.steps += np.bincount(steps, minlength=MAX_STEPS + 1)
+        self.tokens += int(c["tokens"][finished].sum(dtype=np.int64))
+
+        calls = c["tool"][kind == _KIND["tool_call"]]
+        ids, counts = np.unique(calls[calls > 0], return_counts=True)
+        for tool_id, count in zip(ids, counts, strict=True):
+            self.tool_calls[names[tool_id - 1]] += int(count)
+
+        results = kind == _KIND["tool_result"]
+        tools, durations = c["tool"][results], c["duration"][results]
+        for tool_id in np.unique(tools[tools > 0]):
+            name = names[tool_id - 1]
+            hist = self.tool_latency.setdefault(name, LatencyHistogram())
+            hist.add(durations[tools == tool_id].astype(np.float64))
+
+        flags = c["flags"]
+        self.cache_hits += int(np.count_nonzero(flags & FLAG_CACHE_HIT))
+        self.cache_misses += int(np.count_nonzero(flags & FLAG_CACHE_MISS))
+
+    def as_dict(self) -> dict:
+        runs = int(self.steps.sum())
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "files": self.files,
+            "events": int(self.kinds.sum()),
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "events_by_kind": {
+                k: int(n) for k, n in zip(KINDS, self.kinds, strict=True)
+            },
+            "runs": runs,
+            "runs_failed": int(self.kinds[_KIND["error"]]),
+            "run_latency_seconds": self.run_latency.as_dict(),
+            "steps": {
+                "mean": float(np.arange(MAX_STEPS + 1) @ self.steps) / runs
+                if runs
+                else None,
+                "histogram": {str(i): int(n) for i, n in enumerate(self.steps) if n},
+            },
+            "tokens": {
+                "total": self.tokens,
+                "mean_per_run": self.tokens / runs if runs else None,
+            },
+            "tools": {
+                name: {
+                    "calls": self.tool_calls[name],
+                    "latency_seconds": self.tool_latency[name].as_dict()
+                    if name in self.tool_latency
+                    else None,
+                }
+                for name, _ in self.tool_calls.most_common()
+            },
+            "spill_cache": {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": self.cache_hits / lookups if lookups else None,
+            },
+        }
+
+
+def aggregate(directory: Path) -> Report:
+    report = Report()
+    for path in sorted(directory.glob("events-*.evlog")):
+        report.files += 1
+        for names, columns in read_blocks(path):
+            report.add_block(names, columns)
+    return report
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────────
+
+
+def _fmt(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    return f"{seconds:.2f}s" if seconds >= 1 else f"{seconds * 1000:.0f}ms"
+
+
+def format_report(data: dict) -> str:
+    lat = data["run_latency_seconds"]
+    lines = [
+        f"Files: {data['files']}   Events: {data['events']}   Runs: {data['runs']} "
+        f"({data['runs_failed']} failed)",
+        "",
+        "Run latency   " + "  ".join(f"p{q}={_fmt(lat[f'p{q}'])}" for q in PERCENTILES),
+        f"Steps/run     mean={data['steps']['mean'] or 0:.2f}  "
+        + "  ".join(f"{k}:{v}" for k, v in data["steps"]["histogram"].items()),
+        f"Tokens        total={data['tokens']['total']}  "
+        f"mean/run={data['tokens']['mean_per_run'] or 0:.0f}",
+        "",
+        f"{'Tool':<28}{'calls':>8}{'p50':>10}{'p95':>10}{'p99':>10}",
+    ]
+    for name, tool in data["tools"].items():
+        t = tool["latency_seconds"] or {}
+        lines.append(
+            f"{name:<28}{tool['calls']:>8}{_fmt(t.get('p50')):>10}"
+            f"{_fmt(t.get('p95')):>10}{_fmt(t.get('p99')):>10}"
+        )
+    cache = data["spill_cache"]
+    rate = "-" if cache["hit_rate"] is None else f"{cache['hit_rate']:.1%}"
+    lines += [
+        "",
+        f"Spill cache   hits={cache['hits']}  misses={cache['misses']}  "
+        f"hit rate={rate}",
+    ]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarise agent event logs.")
+    parser.add_argument("log_dir", nargs="?", default=EVENT_LOG_DIR)
+    parser.add_argument("--json", action="store_true", help="Print JSON instead.")
+    args = parser.parse_args()
+
+    data = aggregate(Path(args.log_dir)).as_dict()
+    print(json.dumps(data, indent=2) if args.json else format_report(data))
+
+
+if __name__ == "__main__":
+    main()
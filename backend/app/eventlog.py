@@ -0,0 +1,241 @@
+"""
+Compact event log — every ``run_agent_stream`` event, with timings, on disk.
+
+Events are reduced to a fixed set of numeric columns on the request path and
+handed to a background thread through a bounded queue. The thread batches them
+into columnar blocks and appends those to size-rotated files, so streaming
+never waits on disk I/O. When the queue is full, events are dropped and
+counted rather than slowing requests down.
+
+File layout: a sequence of blocks, each
+
+    header   "<4sII"  magic b"EVL1", record count n, tool-name table length
+    names    UTF-8 tool names joined by "\\n" (column ``tool`` is 1-based; 0 = none)
+    columns  n values per column in ``COLUMNS`` order, little-endian
+
+``app.analytics`` reads these files back with NumPy.
+
+    EVENT_LOG_DIR        — directory for ``events-*.evlog`` files
+    EVENT_LOG_MAX_BYTES  — rotate to a new file past this size
+    EVENT_LOG_BATCH      — max records per block
+    EVENT_LOG_FLUSH_SECONDS — max delay before a partial batch is written
+"""
+
+import logging
+import math
+import os
+import queue
+import random
+import struct
+import threading
+import time
+from pathlib import Path
+
+from app.spill import SPILL_MISS_PREFIX, SPILL_READER_TOOL
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", "data/events")
+EVENT_LOG_MAX_BYTES = int(os.getenv("EVENT_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+EVENT_LOG_BATCH = int(os.getenv("EVENT_LOG_BATCH", "1024"))
+EVENT_LOG_FLUSH_SECONDS = float(os.getenv("EVENT_LOG_FLUSH_SECONDS", "1.0"))
+
+MAGIC = b"EVL1"
+HEADER = struct.Struct("<4sII")
+
+# (name, struct code, NumPy dtype)
+COLUMNS = (
+    ("ts", "d", "<f8"),  # wall-clock time of the event
+    ("run", "Q", "<u8"),  # random id shared by all events of one run
+    ("elapsed", "f", "<f4"),  # seconds since the run started
+    ("kind", "B", "u1"),  # index into KINDS
+    ("step", "H", "<u2"),  # tool calls made so far in the run
+    ("tool", "H", "<u2"),  # 1-based index into the block's tool names
+    ("duration", "f", "<f4"),  # tool latency / total run time, NaN otherwise
+    ("tokens", "I", "<u4"),  # total tokens, on answer/error events
+    ("flags", "B", "u1"),  # FLAG_* bits
+)
+
+KINDS = (
+    "other",
+    "thinking",
+    "tool_call",
+    "tool_progress",
+    "tool_result",
+    "answer",
+    "error",
+)
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+FLAG_CACHE_HIT = 1  # read_tool_output found the spilled page
+FLAG_CACHE_MISS = 2  # read_tool_output found nothing (expired)
+
+_QUEUE_SIZE = 100_000
+
+
+# ── Request-path recorder ──────────────────────────────────────────────────────
+
+
+class RunRecorder:
+    """Turns one run's events into column tuples; cheap enough for the hot path."""
+
+    def __init__(self, log: "EventLog") -> None:
+        self._log = log
+        self._run = random.getrandbits(64)
+        self._started = time.monotonic()
+        self._step = 0
+        # Start time of each tool run still waiting for its result.
+        self._pending: dict[str, float] = {}
+
+    def record(self, event: dict) -> None:
+        if not self._log.running:
+            return
+        now = time.monotonic()
+        kind = event.get("type", "")
+        content = event.get("content")
+        tool = content.get("tool", "") if isinstance(content, dict) else ""
+        duration = math.nan
+        tokens = 0
+        flags = 0
+
+        if kind == "tool_call":
+            self._step += 1
+            if run_id := event.get("run_id"):
+                self._pending[run_id] = now
+        elif kind == "tool_result":
+            # Matched by run id, so a call that never got a result cannot skew
+            # the latency of later calls to the same tool.
+            started = self._pending.pop(event.get("run_id"), None)
+            if started is not None:
+                duration = now - started
+            if tool == SPILL_READER_TOOL:
+                output = str(content.get("output", ""))
+                miss = output.startswith(SPILL_MISS_PREFIX)
+                flags |= FLAG_CACHE_MISS if miss else FLAG_CACHE_HIT
+        elif kind in ("answer", "error"):
+            duration = now - self._started
+            tokens = (event.get("usage") or {}).get("total_tokens", 0)
+
+        self._log.put(
+            (
+                time.time(),
+                self._run,
+                now - self._started,
+                _KIND_CODES.get(kind, 0),
+                min(self._step, 0xFFFF),
+                tool,
+                duration,
+                min(tokens, 0xFFFFFFFF),
+                flags,
+            )
+        )
+
+
+# ── Background writer ──────────────────────────────────────────────────────────
+
+
+def encode_block(records: list[tuple]) -> bytes:
+    """Encode raw records (``tool`` still a name) into one columnar block."""
+    names: dict[str, int] = {}
+    rows = []
+    for record in records:
+        tool = record[5]
+        if tool and tool not in names:
+            names[tool] = len(names) + 1
+        rows.append((*record[:5], names.get(tool, 0), *record[6:]))
+
+    table = "\n".join(names).encode()
+    n = len(rows)
+    parts = [HEADER.pack(MAGIC, n, len(table)), table]
+    for i, (_, code, _) in enumerate(COLUMNS):
+        parts.append(struct.pack(f"<{n}{code}", *(row[i] for row in rows)))
+    return b"".join(parts)
+
+
+class EventLog:
+    """Bounded queue plus a writer thread that appends blocks to rotating files."""
+
+    def __init__(
+        self,
+        directory: str = EVENT_LOG_DIR,
+        max_bytes: int = EVENT_LOG_MAX_BYTES,
+        batch: int = EVENT_LOG_BATCH,
+        flush_seconds: float = EVENT_LOG_FLUSH_SECONDS,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.batch = batch
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self._queue: queue.Queue[tuple | None] = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._thread: threading.Thread | None = None
+        self._file = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def recorder(self) -> RunRecorder:
+        return RunRecorder(self)
+
+    def put(self, record: tuple) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(
+            target=self._writer, name="event-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Flush pending events and stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self.dropped:
+            logger.warning("Event log dropped %d event(s).", self.dropped)
+
+    # ── Internals ──────────────────────────────────────────────────────────────
+
+    def _writer(self) -> None:
+        stopping = False
+        while not stopping:
+            records = []
+            deadline = time.monotonic() + self.flush_seconds
+            while len(records) < self.batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                records.append(item)
+            if records:
+                try:
+                    self._write(encode_block(records))
+                except Exception as exc:
+                    logger.exception("Event log write failed: %s", exc)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, block: bytes) -> None:
+        if self._file is None or self._file.tell() + len(block) > self.max_bytes:
+            if self._file is not None:
+                self._file.close()
+            path = self.directory / f"events-{time.time_ns()}.evlog"
+            self._file = open(path, "ab")
+        self._file.write(block)
+        self._file.flush()
+
+
+event_log = EventLog()
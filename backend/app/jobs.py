@@ -0,0 +1,413 @@
+"""
+Durable async jobs — run the agent in the background and persist its events.
+
+A job is created with ``JobManager.submit`` and picked up by a fixed pool of
+worker tasks. Every event produced by ``run_agent_stream`` is appended to a
+SQLite log keyed by ``(job_id, seq)`` so clients can poll or stream from any
+offset, independently of the connection that created the job. Events are
+buffered per job and written in batches by a background task, so the agent
+stream never waits on disk I/O.
+
+LangGraph checkpoints are stored in a second SQLite file. Jobs that were still
+queued or running when the backend stopped are re-enqueued at startup and
+resume from their last checkpoint instead of starting over.
+
+    JOBS_DB_PATH          — SQLite file for jobs and their events
+    JOBS_CHECKPOINT_PATH  — SQLite file for LangGraph checkpoints
+    JOBS_WORKERS          — jobs running at once
+    JOBS_FLUSH_EVENTS     — buffered events per job that trigger a write
+    JOBS_FLUSH_SECONDS    — max delay before buffered events are written
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any
+
+from app.agent import run_agent_stream
+from app.scheduler import BULK, scheduler
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "data/jobs.sqlite3")
+JOBS_CHECKPOINT_PATH = os.getenv("JOBS_CHECKPOINT_PATH", "data/checkpoints.sqlite3")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+JOBS_FLUSH_EVENTS = int(os.getenv("JOBS_FLUSH_EVENTS", "32"))
+JOBS_FLUSH_SECONDS = float(os.getenv("JOBS_FLUSH_SECONDS", "0.1"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+TERMINAL_STATUSES = frozenset({SUCCEEDED, FAILED})
+TERMINAL_EVENTS = frozenset({"answer", "error"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    query       TEXT NOT NULL,
+    client_id   TEXT NOT NULL DEFAULT 'anonymous',
+    status      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    job_id   TEXT    NOT NULL,
+    seq      INTEGER NOT NULL,
+    payload  TEXT    NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+# ── Event store ────────────────────────────────────────────────────────────────
+
+
+class JobStore:
+    """
+    Append-only SQLite log of jobs and their events.
+
+    All methods are blocking; ``JobManager`` calls them through
+    ``asyncio.to_thread`` so the event loop is never stalled on disk I/O. A lock
+    serialises access to the shared connection across those threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Next sequence number per job with events appended by this process.
+        self._next_seq: dict[str, int] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def create_job(self, query: str, client_id: str) -> dict:
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "query": query,
+            "client_id": client_id,
+            "status": QUEUED,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, query, client_id, status, created_at, "
+                "updated_at) VALUES (:id, :query, :client_id, :status, "
+                ":created_at, :updated_at)",
+                job,
+            )
+        return job
+
+    def get_job(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT j.*, (SELECT COUNT(*) FROM events e WHERE e.job_id = j.id) "
+                "AS event_count FROM jobs j WHERE j.id = ?",
+                (job_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (status, time.time(), job_id),
+            )
+            if status in TERMINAL_STATUSES:
+                self._next_seq.pop(job_id, None)
+
+    def append_events(self, job_id: str, events: list[dict]) -> int:
+        """Append *events* to the job's log in one transaction; return the last seq."""
+        with self._lock, self._conn:
+            seq = self._next_seq.get(job_id)
+            if seq is None:
+                (seq,) = self._conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE job_id = ?",
+                    (job_id,),
+                ).fetchone()
+            self._conn.executemany(
+                "INSERT INTO events (job_id, seq, payload) VALUES (?, ?, ?)",
+                [
+                    (job_id, seq + i, json.dumps(event, default=str))
+                    for i, event in enumerate(events)
+                ],
+            )
+            self._next_seq[job_id] = seq + len(events)
+        return seq + len(events) - 1
+
+    def events_after(self, job_id: str, after: int, limit: int) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, payload FROM events WHERE job_id = ? AND seq > ? "
+                "ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+        return [
+            {"seq": row["seq"], "event": json.loads(row["payload"])} for row in rows
+        ]
+
+    def last_event(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM events WHERE job_id = ? ORDER BY seq DESC LIMIT 1",
+                (job_id,),
+            ).fetchone()
+        return json.loads(row["payload"]) if row else None
+
+    def unfinished_jobs(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+# ── Worker pool ────────────────────────────────────────────────────────────────
+
+
+class JobManager:
+    """Owns the job store, the checkpointer and the background worker pool."""
+
+    def __init__(
+        self,
+        db_path: str = JOBS_DB_PATH,
+        checkpoint_path: str = JOBS_CHECKPOINT_PATH,
+        workers: int = JOBS_WORKERS,
+    ) -> None:
+        self._db_path = db_path
+        self._checkpoint_path = checkpoint_path
+        self._worker_count = workers
+        # Queue, locks and events bind to the loop that first uses them; they
+        # are created in start() so the manager survives a restart on a new loop.
+        self._queue: asyncio.Queue[str]
+        self._updated: asyncio.Condition
+        self._flush_wanted: asyncio.Event
+        self._flush_lock: asyncio.Lock
+        self._workers: list[asyncio.Task] = []
+        self._pending: dict[str, list[dict]] = {}
+        self._flusher: asyncio.Task | None = None
+        self._exit_stack = AsyncExitStack()
+        self._store: JobStore | None = None
+        self._checkpointer: AsyncSqliteSaver | None = None
+        self._tools: list = []
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            raise RuntimeError("JobManager has not been started.")
+        return self._store
+
+    async def start(self, tools: list) -> None:
+        """Open the stores, re-enqueue unfinished jobs and spawn the workers."""
+        self._tools = tools
+        self._queue = asyncio.Queue()
+        self._updated = asyncio.Condition()
+        self._flush_wanted = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._store = await asyncio.to_thread(JobStore, self._db_path)
+        Path(self._checkpoint_path).parent.mkdir(parents=True, exist_ok=True)
+        self._checkpointer = await self._exit_stack.enter_async_context(
+            AsyncSqliteSaver.from_conn_string(self._checkpoint_path)
+        )
+
+        pending = await asyncio.to_thread(self.store.unfinished_jobs)
+        for job in pending:
+            self._queue.put_nowait(job["id"])
+        if pending:
+            logger.info("Re-enqueued %d unfinished job(s).", len(pending))
+
+        self._flusher = asyncio.create_task(self._flush_loop(), name="job-flusher")
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self._worker_count)
+        ]
+        for task in [self._flusher, *self._workers]:
+            task.add_done_callback(self._task_exited)
+
+    async def stop(self) -> None:
+        """Cancel the workers; running jobs are resumed on the next start."""
+        tasks = [*self._workers, self._flusher] if self._flusher else self._workers
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._flusher = None
+        await self._flush_all()
+        await self._exit_stack.aclose()
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    async def submit(self, query: str, client_id: str = "anonymous") -> dict:
+        job = await asyncio.to_thread(self.store.create_job, query, client_id)
+        self._queue.put_nowait(job["id"])
+        return job
+
+    async def get(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.get_job, job_id)
+
+    async def events(self, job_id: str, after: int = 0, limit: int = 500) -> list[dict]:
+        return await asyncio.to_thread(self.store.events_after, job_id, after, limit)
+
+    async def follow(
+        self, job_id: str, after: int = 0, poll_interval: float = 1.0
+    ) -> AsyncIterator[dict]:
+        """
+        Yield ``{"seq": ..., "event": ...}`` records after *after* until the job
+        reaches a terminal status and its log has been fully drained.
+        """
+        while True:
+            batch = await self.events(job_id, after)
+            for record in batch:
+                after = record["seq"]
+                yield record
+            if batch:
+                continue
+
+            job = await self.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATUSES:
+                return
+            async with self._updated:
+                try:
+                    await asyncio.wait_for(self._updated.wait(), poll_interval)
+                except TimeoutError:
+                    pass
+
+    # ── Internals ──────────────────────────────────────────────────────────────
+
+    def _task_exited(self, task: asyncio.Task) -> None:
+        # Workers and the flusher only end by cancellation in stop(); anything
+        # else leaves jobs queued or events unwritten, so say so loudly.
+        if task.cancelled():
+            return
+        exc = task.exception()
+        logger.error(
+            "%s exited unexpectedly; jobs will stall until restart.",
+            task.get_name(),
+            exc_info=exc,
+        )
+
+    async def _notify(self) -> None:
+        async with self._updated:
+            self._updated.notify_all()
+
+    def _append(self, job_id: str, event: dict) -> None:
+        """Buffer *event*; the flusher writes it within ``JOBS_FLUSH_SECONDS``."""
+        pending = self._pending.setdefault(job_id, [])
+        pending.append(event)
+        if len(pending) >= JOBS_FLUSH_EVENTS:
+            self._flush_wanted.set()
+
+    async def _flush(self, job_id: str) -> None:
+        # One flush at a time keeps a job's batches in sequence order.
+        async with self._flush_lock:
+            events = self._pending.pop(job_id, None)
+            if not events:
+                return
+            try:
+                await asyncio.to_thread(self.store.append_events, job_id, events)
+            except BaseException:
+                self._pending[job_id] = events + self._pending.get(job_id, [])
+                raise
+        await self._notify()
+
+    async def _flush_all(self) -> None:
+        for job_id in list(self._pending):
+            await self._flush(job_id)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), JOBS_FLUSH_SECONDS)
+            except TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            try:
+                await self._flush_all()
+            except Exception as exc:
+                logger.exception("Flushing job events failed: %s", exc)
+
+    async def _set_status(self, job_id: str, status: str) -> None:
+        # Buffered events land before the status that tells followers to stop.
+        await self._flush(job_id)
+        await asyncio.to_thread(self.store.set_status, job_id, status)
+        await self._notify()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.exception("Job %s crashed: %s", job_id, exc)
+                await self._fail(job_id, str(exc))
+            finally:
+                self._queue.task_done()
+
+    async def _fail(self, job_id: str, message: str) -> None:
+        self._append(job_id, {"type": "error", "content": message})
+        try:
+            await self._set_status(job_id, FAILED)
+        except Exception as exc:
+            # Keep the worker alive; the job is re-enqueued on the next start.
+            logger.exception("Could not mark job %s as failed: %s", job_id, exc)
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return
+
+        # A previous process may have logged the final event but died before
+        # recording the status — nothing left to run in that case.
+        last = await asyncio.to_thread(self.store.last_event, job_id)
+        if last is not None and last.get("type") in TERMINAL_EVENTS:
+            await self._finish(job_id, last)
+            return
+
+        config: dict[str, Any] = {"configurable": {"thread_id": job_id}}
+        resume = await self._checkpointer.aget_tuple(config) is not None
+        if resume:
+            logger.info("Resuming job %s from its last checkpoint.", job_id)
+
+        # Jobs compete with /query for agent slots as bulk work; they wait for
+        # a slot instead of being shed.
+        final: dict | None = None
+        async with scheduler.slot(job["client_id"], BULK, sheddable=False):
+            await self._set_status(job_id, RUNNING)
+            async for event in run_agent_stream(
+                job["query"],
+                self._tools,
+                checkpointer=self._checkpointer,
+                thread_id=job_id,
+                resume=resume,
+                client_id=job["client_id"],
+            ):
+                self._append(job_id, event)
+                if event.get("type") in TERMINAL_EVENTS:
+                    final = event
+        await self._finish(job_id, final)
+
+    async def _finish(self, job_id: str, final: dict | None) -> None:
+        ok = final is not None and final.get("type") == "answer"
+        await self._set_status(job_id, SUCCEEDED if ok else FAILED)
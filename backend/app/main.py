@@ -4,17 +4,24 @@ FastAPI server — exposes the ReAct agent over HTTP with Server-Sent Events (SS
 Endpoints
 ---------
 POST /query          — run the agent; streams SSE events back to the client
+POST /jobs           — enqueue a durable background agent run
+GET  /jobs/{id}      — job status
+GET  /jobs/{id}/events — stream (SSE) or poll a job's events from any offset
 GET  /tools          — list all tools currently loaded from the MCP server
-GET  /health         — liveness probe
+GET  /health         — liveness probe and circuit breaker state
+GET  /scheduler      — per-tenant queue depth and wait-time metrics
 """
 
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 
+from app.eventlog import event_log
 from app.mcp_client import get_mcp_tools
-from app.routers import health, query, tools
+from app.routers import health, jobs, query, scheduler, tools
 from app.state import state
+from app.tokens import load_tokenizer
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -33,7 +40,7 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load MCP tools once at startup."""
+    """Load MCP tools once at startup and run the background job workers."""
     logger.info("Loading tools from MCP server …")
     try:
         state.tools = await get_mcp_tools()
@@ -43,8 +50,13 @@ async def lifespan(app: FastAPI):
         logger.warning("Tool loading failed: %s — agent will run without tools.", exc)
         state.tools = []
         state.tools_loaded = False
+    await asyncio.to_thread(load_tokenizer)
+    event_log.start()
+    await state.jobs.start(state.tools)
     yield
     logger.info("Shutting down.")
+    await state.jobs.stop()
+    await asyncio.to_thread(event_log.stop)
 
 
 # ── Application ────────────────────────────────────────────────────────────────
@@ -66,6 +78,8 @@ app.add_middleware(
 app.include_router(health.router)
 app.include_router(tools.router)
 app.include_router(query.router)
+app.include_router(jobs.router)
+app.include_router(scheduler.router)
 
 
 # ── Dev entrypoint ─────────────────────────────────────────────────────────────
@@ -3,12 +3,20 @@ MCP Client — connects to the MCP server over Streamable HTTP and exposes
 its tools as LangChain tools.
 
 The server is expected to accept HTTP POST requests at MCP_SERVER_URL + MCP_SERVER_PATH.
+
+Progress notifications sent by the server while a tool runs are re-dispatched as
+LangChain ``tool_progress`` custom events, so they surface in the agent's event
+stream next to the regular tool start/end events. Notifications from a hedged
+call's duplicate attempt are dropped so each call's progress is reported once.
 """
 
 import logging
 import os
 
+from app.resilience import superseded_attempt
+from langchain_core.callbacks import adispatch_custom_event
 from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.callbacks import CallbackContext, Callbacks
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
 logger = logging.getLogger(__name__)
@@ -17,6 +25,33 @@ MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://mcp_server")
 MCP_SERVER_PORT = os.getenv("MCP_SERVER_PORT", "8000")
 MCP_SERVER_PATH = os.getenv("MCP_SERVER_PATH", "/mcp")
 
+TOOL_PROGRESS_EVENT = "tool_progress"
+
+
+async def _on_progress(
+    progress: float,
+    total: float | None,
+    message: str | None,
+    context: CallbackContext,
+) -> None:
+    """Forward an MCP progress notification into the running tool's callbacks."""
+    if superseded_attempt():
+        return
+    try:
+        await adispatch_custom_event(
+            TOOL_PROGRESS_EVENT,
+            {
+                "tool": context.tool_name,
+                "progress": progress,
+                "total": total,
+                "message": message,
+            },
+        )
+    except RuntimeError:
+        # Called outside a LangChain run (e.g. a direct tool call) — nothing to
+        # forward the notification to.
+        logger.debug("Dropped progress for %s: no parent run.", context.tool_name)
+
 
 async def get_mcp_tools() -> list[BaseTool]:
     """
@@ -36,7 +71,9 @@ async def get_mcp_tools() -> list[BaseTool]:
     }
 
     try:
-        client = MultiServerMCPClient(config)
+        client = MultiServerMCPClient(
+            config, callbacks=Callbacks(on_progress=_on_progress)
+        )
         tools = await client.get_tools()
         logger.info(
             "Loaded %d tool(s) from MCP server: %s",
@@ -0,0 +1,427 @@
+"""
+Circuit breakers and hedged requests for the LLM and MCP dependencies.
+
+Every model call goes through the ``llm`` breaker and every MCP tool call
+through both the ``mcp`` (server-wide) breaker and a per-tool ``mcp:<name>``
+breaker. Local tools such as ``read_tool_output`` bypass the breakers.
+A breaker opens once enough recent calls failed or were slower than the
+latency threshold, rejects calls immediately while open, and lets a few probe
+calls through (half-open) after a cool-down before closing again.
+
+Tools listed in ``HEDGED_TOOLS`` are hedged: if a call has not finished after
+the tool's observed p95 latency, a duplicate is started and whichever finishes
+first wins. Only first attempts feed the latency samples, so hedging does not
+drag its own p95 down. Hedging happens inside the tool run, below LangChain's
+callbacks, so a hedged call still shows up as a single tool call.
+
+Rejected calls are reported to the event stream as ``tool_error`` custom
+events, since the tool never starts and no tool callbacks fire for them.
+
+    BREAKER_WINDOW           — number of recent calls considered
+    BREAKER_MIN_CALLS        — calls needed before the breaker may open
+    BREAKER_FAILURE_RATE     — failure ratio that opens the breaker
+    BREAKER_RESET_SECONDS    — open → half-open cool-down
+    BREAKER_HALF_OPEN_CALLS  — probe calls allowed while half-open
+    LLM_SLOW_CALL_SECONDS    — model calls slower than this count as failures
+    TOOL_SLOW_CALL_SECONDS   — tool calls slower than this count as failures
+    HEDGED_TOOLS             — comma-separated tool names to hedge
+    HEDGE_MIN_SAMPLES        — latency samples needed before hedging kicks in
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.callbacks import adispatch_custom_event, dispatch_custom_event
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool
+
+logger = logging.getLogger(__name__)
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))
+LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "60"))
+TOOL_SLOW_CALL_SECONDS = float(os.getenv("TOOL_SLOW_CALL_SECONDS", "10"))
+HEDGED_TOOLS = frozenset(
+    name.strip() for name in os.getenv("HEDGED_TOOLS", "").split(",") if name.strip()
+)
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+LLM_BREAKER = "llm"
+MCP_BREAKER = "mcp"
+
+TOOL_ERROR_EVENT = "tool_error"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_LATENCY_SAMPLES = 100
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its circuit breaker is open."""
+
+
+# ── Breaker ────────────────────────────────────────────────────────────────────
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker with error and latency thresholds."""
+
+    def __init__(
+        self,
+        name: str,
+        slow_call_seconds: float,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+        half_open_calls: int = BREAKER_HALF_OPEN_CALLS,
+    ) -> None:
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_seconds = reset_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a call would currently be allowed, without claiming a probe."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= self.reset_seconds
+            if self.state == HALF_OPEN:
+                return self._probes < self.half_open_calls
+            return True
+
+    def allow(self) -> bool:
+        """Claim permission for one call; half-open breakers admit few probes."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    return False
+                self._probes += 1
+            return True
+
+    def record(self, duration: float, ok: bool = True, sample: bool = True) -> None:
+        """
+        Record a finished call; slow calls count as failures. With *sample*
+        unset the duration is not added to the latency samples behind ``p95``.
+        """
+        failed = not ok or duration > self.slow_call_seconds
+        with self._lock:
+            if ok and sample:
+                self._latencies.append(duration)
+            if self.state == HALF_OPEN:
+                self._transition(OPEN if failed else CLOSED)
+                return
+            self._outcomes.append(failed)
+            if self.state == CLOSED and self._tripped():
+                self._transition(OPEN)
+
+    def sample(self, duration: float) -> None:
+        """Add one latency sample without recording a call outcome."""
+        with self._lock:
+            self._latencies.append(duration)
+
+    def release(self) -> None:
+        """Return an unused half-open probe, e.g. when the call was cancelled."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    @contextmanager
+    def guard(self, sample_latency: bool = True) -> Iterator[None]:
+        """
+        Run the body as one call through the breaker, recording its outcome.
+        Raises ``CircuitOpenError`` up front if the call is not allowed.
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is open.")
+        start = time.monotonic()
+        try:
+            yield
+        except CircuitOpenError:
+            self.release()
+            raise
+        except Exception:
+            self.record(time.monotonic() - start, ok=False)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record(time.monotonic() - start, sample=sample_latency)
+
+    def p95(self) -> float | None:
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(self._outcomes)
+        p95 = self.p95()
+        return {
+            "state": self.state,
+            "recent_calls": calls,
+            "recent_failures": failures,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+    def _tripped(self) -> bool:
+        calls = len(self._outcomes)
+        return calls >= self.min_calls and sum(self._outcomes) / calls >= (
+            self.failure_rate
+        )
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning("Circuit breaker %s: %s → %s", self.name, self.state, state)
+        self.state = state
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+
+breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _registry_lock:
+        if name not in breakers:
+            slow = (
+                LLM_SLOW_CALL_SECONDS if name == LLM_BREAKER else TOOL_SLOW_CALL_SECONDS
+            )
+            breakers[name] = CircuitBreaker(name, slow_call_seconds=slow)
+        return breakers[name]
+
+
+# Registered up front so /health reports them before the first call.
+get_breaker(LLM_BREAKER)
+get_breaker(MCP_BREAKER)
+
+
+def tool_breaker(tool_name: str) -> CircuitBreaker:
+    return get_breaker(f"{MCP_BREAKER}:{tool_name}")
+
+
+def available_tools(tools: list) -> list:
+    """Drop tools whose breaker is open — all of them if the MCP server is down."""
+    if not get_breaker(MCP_BREAKER).available():
+        return []
+    return [t for t in tools if tool_breaker(t.name).available()]
+
+
+# ── Hedging ────────────────────────────────────────────────────────────────────
+
+# Inside a hedged attempt: whether its result is (or will be) thrown away.
+_superseded: contextvars.ContextVar[Callable[[], bool]] = contextvars.ContextVar(
+    "hedge_superseded", default=lambda: False
+)
+
+
+def superseded_attempt() -> bool:
+    """
+    True inside a hedge duplicate, or a first attempt that lost to one. Side
+    effects such as progress notifications should be reported only once.
+    """
+    return _superseded.get()()
+
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    delay: float,
+    on_first: Callable[[float], None] | None = None,
+) -> Any:
+    """
+    Await *call*; if it has not finished after *delay* seconds start a second
+    copy and return the first successful result, cancelling the loser.
+
+    If *on_first* is given it receives the latency of the first attempt once
+    that attempt succeeds. A first attempt that loses is then left to finish in
+    the background rather than cancelled, so slow calls are still measured.
+    """
+    loop = asyncio.get_running_loop()
+    lost = False
+
+    def attempt(superseded: Callable[[], bool]) -> asyncio.Task:
+        context = contextvars.copy_context()
+        context.run(_superseded.set, superseded)
+        return loop.create_task(call(), context=context)
+
+    start = time.monotonic()
+    first = attempt(lambda: lost)
+    if on_first is not None:
+
+        def report(task: asyncio.Future) -> None:
+            if not task.cancelled() and task.exception() is None:
+                on_first(time.monotonic() - start)
+
+        first.add_done_callback(report)
+
+    done, pending = await asyncio.wait({first}, timeout=delay)
+    if not done:
+        pending.add(attempt(lambda: True))
+
+    keep = first if on_first is not None else None
+    error: BaseException | None = None
+    try:
+        while True:
+            for task in done:
+                if task.exception() is None:
+                    lost = task is not first
+                    return task.result()
+                error = task.exception()
+            if not pending:
+                raise error
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+    except BaseException:
+        keep = None
+        raise
+    finally:
+        for task in pending:
+            if task is not keep:
+                task.cancel()
+
+
+def hedged_tool(
+    tool: BaseTool,
+    delay: float,
+    on_first: Callable[[float], None] | None = None,
+) -> BaseTool:
+    """
+    Copy of *tool* whose coroutine is ``hedged``. The duplicate runs inside the
+    copy's single tool run, so callbacks see one call however many attempts it
+    takes. Tools without a coroutine are returned unchanged.
+    """
+    if not isinstance(tool, StructuredTool) or tool.coroutine is None:
+        return tool
+    coroutine = tool.coroutine
+
+    # ``wraps`` keeps the signature that injected arguments are detected from.
+    @functools.wraps(coroutine)
+    async def call(*args, **kwargs):
+        return await hedged(lambda: coroutine(*args, **kwargs), delay, on_first)
+
+    return tool.model_copy(update={"coroutine": call})
+
+
+# ── Middleware ─────────────────────────────────────────────────────────────────
+
+
+class ResilienceMiddleware(AgentMiddleware):
+    """
+    Guard model calls and the MCP tools named in *mcp_tools* with circuit
+    breakers; hedge slow tools. Other tool calls pass through untouched.
+    """
+
+    def __init__(self, mcp_tools: Iterable[str] = ()) -> None:
+        super().__init__()
+        self.mcp_tools = frozenset(mcp_tools)
+
+    def wrap_model_call(self, request, handler: Callable):
+        with get_breaker(LLM_BREAKER).guard():
+            return handler(request)
+
+    async def awrap_model_call(self, request, handler: Callable[..., Awaitable]):
+        with get_breaker(LLM_BREAKER).guard():
+            return await handler(request)
+
+    def wrap_tool_call(self, request, handler: Callable):
+        name = request.tool_call["name"]
+        if name not in self.mcp_tools:
+            return handler(request)
+        try:
+            with get_breaker(MCP_BREAKER).guard(), tool_breaker(name).guard():
+                return handler(request)
+        except CircuitOpenError as exc:
+            message = self._error_message(request, exc)
+            try:
+                dispatch_custom_event(TOOL_ERROR_EVENT, _error_event(message))
+            except RuntimeError:
+                pass  # not inside a LangChain run
+            return message
+        except Exception as exc:
+            return self._error_message(request, exc)
+
+    async def awrap_tool_call(self, request, handler: Callable[..., Awaitable]):
+        name = request.tool_call["name"]
+        if name not in self.mcp_tools:
+            return await handler(request)
+        breaker = tool_breaker(name)
+        delay = breaker.p95() if name in HEDGED_TOOLS else None
+        try:
+            with (
+                get_breaker(MCP_BREAKER).guard(),
+                breaker.guard(sample_latency=delay is None),
+            ):
+                if delay is None:
+                    return await handler(request)
+                tool = hedged_tool(request.tool, delay, on_first=breaker.sample)
+                return await handler(request.override(tool=tool))
+        except CircuitOpenError as exc:
+            message = self._error_message(request, exc)
+            try:
+                await adispatch_custom_event(TOOL_ERROR_EVENT, _error_event(message))
+            except RuntimeError:
+                pass  # not inside a LangChain run
+            return message
+        except Exception as exc:
+            return self._error_message(request, exc)
+
+    @staticmethod
+    def _error_message(request, exc: Exception) -> ToolMessage:
+        """Turn a failed or rejected call into a tool error the model can read."""
+        call = request.tool_call
+        if isinstance(exc, CircuitOpenError):
+            content = (
+                f"Tool '{call['name']}' is temporarily unavailable. "
+                "Answer without it if you can."
+            )
+        else:
+            logger.warning("Tool %s failed: %s", call["name"], exc)
+            content = f"Tool call failed: {exc}"
+        return ToolMessage(
+            content=content,
+            tool_call_id=call["id"],
+            name=call["name"],
+            status="error",
+        )
+
+
+def _error_event(message: ToolMessage) -> dict:
+    # Failed calls are reported through on_tool_error; rejected calls never
+    # start a tool run, so they are announced with a custom event instead.
+    return {"tool": message.name, "output": message.content, "status": "error"}
@@ -1,3 +1,4 @@
+from app.resilience import breakers
 from app.state import state
 from fastapi import APIRouter
 
@@ -10,4 +11,5 @@ async def health():
         "status": "ok",
         "tools_loaded": state.tools_loaded,
         "tool_count": len(state.tools),
+        "breakers": {name: b.snapshot() for name, b in sorted(breakers.items())},
     }
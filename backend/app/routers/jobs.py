@@ -0,0 +1,74 @@
+from collections.abc import AsyncIterator
+
+from app.routers.query import serialize_event
+from app.schemas import JobEvent, JobInfo, QueryRequest
+from app.state import state
+from fastapi import APIRouter, Header, HTTPException, Query
+from sse_starlette.sse import EventSourceResponse
+
+router = APIRouter()
+
+
+async def _get_job_or_404(job_id: str) -> dict:
+    job = await state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@router.post("/jobs", response_model=JobInfo, status_code=202)
+async def create_job(
+    request: QueryRequest,
+    x_client_id: str = Header("anonymous", description="Client id for token budgets."),
+):
+    """Enqueue the query as a background agent run and return its job id."""
+    return await state.jobs.submit(request.query, x_client_id)
+
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    """Return the job's status and the number of events logged so far."""
+    return await _get_job_or_404(job_id)
+
+
+@router.get("/jobs/{job_id}/events", response_model=list[JobEvent])
+async def job_events(
+    job_id: str,
+    after: int = Query(0, ge=0, description="Only return events with seq > after."),
+    stream: bool = Query(True, description="Stream via SSE instead of polling."),
+    limit: int = Query(500, ge=1, le=5000, description="Page size when polling."),
+    last_event_id: int | None = Header(
+        None, ge=0, description="SSE reconnect offset; takes precedence over after."
+    ),
+):
+    """
+    Read the job's event log from any offset.
+
+    With ``stream=true`` (default) the events are sent as Server-Sent Events
+    until the job finishes, each one tagged with its ``seq`` as the SSE id. On
+    reconnect, EventSource clients send it back as ``Last-Event-ID``, which
+    takes precedence over ``after``:
+
+    ```
+    id: 1
+    data: {"type": "thinking", "content": "..."}
+    ...
+    data: [DONE]
+    ```
+
+    With ``stream=false`` a single page of ``{"seq", "event"}`` records is
+    returned as JSON for polling.
+    """
+    await _get_job_or_404(job_id)
+    if last_event_id is not None:
+        after = last_event_id
+
+    if not stream:
+        return await state.jobs.events(job_id, after, limit)
+
+    async def event_generator() -> AsyncIterator[dict]:
+        async for record in state.jobs.follow(job_id, after):
+            yield {"id": str(record["seq"]), "data": serialize_event(record["event"])}
+        yield {"data": "[DONE]"}
+
+    return EventSourceResponse(event_generator())
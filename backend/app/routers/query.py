@@ -3,16 +3,19 @@ from collections.abc import AsyncIterator
 from typing import Any
 
 from app.agent import run_agent_stream
+from app.scheduler import ShedError, classify, scheduler
 from app.schemas import QueryRequest
 from app.state import state
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException
 from sse_starlette.sse import EventSourceResponse
 
 router = APIRouter()
 
 
 def serialize_event(event: Any) -> Any:
-    if hasattr(event, "model_dump"):  # Pydantic v2
+    if isinstance(event, dict):
+        return json.dumps(event, default=str)
+    elif hasattr(event, "model_dump"):  # Pydantic v2
         return json.dumps(event.model_dump())
     elif hasattr(event, "dict"):  # Pydantic v1
         return json.dumps(event.dict())
@@ -23,25 +26,51 @@ def serialize_event(event: Any) -> Any:
 
 
 @router.post("/query")
-async def query(request: QueryRequest):
+async def query(
+    request: QueryRequest,
+    x_client_id: str = Header("anonymous", description="Client id for token budgets."),
+    x_priority: str | None = Header(
+        None, description="interactive | default | bulk (capped per tenant)."
+    ),
+):
     """
     Run the ReAct agent on the given query.
 
+    Runs are scheduled fairly across tenants (``X-Client-Id``) and priorities
+    (``X-Priority``). Under overload low-priority requests are rejected with
+    503 before streaming starts, or end with an ``error`` event if they are
+    evicted while queued.
+
     Streams Server-Sent Events with the following JSON payloads:
 
     ```
     data: {"type": "thinking",    "content": "<partial LLM token>"}
     data: {"type": "tool_call",   "content": {"tool": "...", "input": {...}}}
+    data: {"type": "tool_progress", "content": {"tool": "...", "progress": 1, ...}}
     data: {"type": "tool_result", "content": {"tool": "...", "output": "..."}}
-    data: {"type": "answer",      "content": "<final answer>"}
+    data: {"type": "answer",      "content": "<final answer>", "usage": {...}}
     data: {"type": "error",       "content": "<error message>"}
     data: [DONE]
     ```
     """
 
+    priority = classify(x_client_id, x_priority)
+    if scheduler.would_shed(x_client_id, priority):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Overloaded: {priority} requests are being shed.",
+            headers={"Retry-After": "5"},
+        )
+
     async def event_generator() -> AsyncIterator[dict]:
-        async for event in run_agent_stream(request.query, state.tools):
-            yield {"data": serialize_event(event)}
+        try:
+            async with scheduler.slot(x_client_id, priority):
+                async for event in run_agent_stream(
+                    request.query, state.tools, client_id=x_client_id
+                ):
+                    yield {"data": serialize_event(event)}
+        except ShedError as exc:
+            yield {"data": serialize_event({"type": "error", "content": str(exc)})}
         yield {"data": "[DONE]"}
 
     return EventSourceResponse(event_generator())
@@ -0,0 +1,10 @@
+from app.scheduler import scheduler
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.get("/scheduler")
+async def scheduler_metrics():
+    """Return slot usage plus per-tenant queue depth, shed counts and wait times."""
+    return scheduler.metrics()
@@ -0,0 +1,379 @@
+"""
+Priority scheduler — weighted fair queuing and load shedding for agent runs.
+
+Every agent run takes a slot from a fixed pool (``SCHEDULER_MAX_CONCURRENT``).
+When the pool is full, runs wait in one queue per priority, served by
+start-time fair queuing: each ``(tenant, priority)`` flow gets virtual start
+tags spaced by ``1 / weight``, so higher priorities get proportionally more
+slots and a heavy tenant cannot starve the others within the same priority.
+``SCHEDULER_RESERVED_SLOTS`` slots are only ever given to interactive runs, so
+an interactive request never waits behind a pool full of bulk work.
+
+Under overload the lowest priorities are shed first: a priority may only fill
+the queue up to its share of ``SCHEDULER_MAX_QUEUED``; beyond that a new run
+evicts a queued run of strictly lower priority, or the newest run of the
+tenant with the largest backlog at its own priority, or is rejected. No tenant
+may hold more than ``SCHEDULER_MAX_QUEUED_PER_TENANT`` queued runs. Background
+jobs are never shed and do not count against either limit.
+
+Tenants are identified by the self-reported ``X-Client-Id`` header, so only
+tenants listed in ``TENANT_PRIORITIES`` can reach ``interactive``; any other id
+is capped at ``default``. Switching ids therefore never raises a tenant above
+``default``, and the per-tenant queue limit bounds what each id can hold.
+
+    SCHEDULER_MAX_CONCURRENT        — agent runs executing at once
+    SCHEDULER_MAX_QUEUED            — runs allowed to wait for a slot
+    SCHEDULER_MAX_QUEUED_PER_TENANT — queued runs per tenant
+                                      (default: a quarter of the queue)
+    SCHEDULER_RESERVED_SLOTS        — slots kept free for interactive runs
+    TENANT_PRIORITIES               — JSON {"tenant": "interactive", ...}: highest
+                                      priority a tenant may request
+                                      (default: default)
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from collections import Counter, defaultdict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", "8"))
+SCHEDULER_MAX_QUEUED = int(os.getenv("SCHEDULER_MAX_QUEUED", "64"))
+SCHEDULER_MAX_QUEUED_PER_TENANT = int(os.getenv("SCHEDULER_MAX_QUEUED_PER_TENANT", "0"))
+SCHEDULER_RESERVED_SLOTS = int(os.getenv("SCHEDULER_RESERVED_SLOTS", "1"))
+TENANT_PRIORITIES: dict[str, str] = json.loads(os.getenv("TENANT_PRIORITIES", "{}"))
+
+INTERACTIVE = "interactive"
+DEFAULT = "default"
+BULK = "bulk"
+
+# Share of the fair-queue capacity each priority receives.
+PRIORITY_WEIGHTS = {INTERACTIVE: 8.0, DEFAULT: 4.0, BULK: 1.0}
+# Fraction of SCHEDULER_MAX_QUEUED a priority may fill before it is shed.
+SHED_THRESHOLDS = {INTERACTIVE: 1.0, DEFAULT: 0.8, BULK: 0.5}
+
+_WAIT_SAMPLES = 256
+# Idle tenants' stats are dropped after this long; flow state is swept this often.
+_STATS_TTL_SECONDS = 3600.0
+_SWEEP_SECONDS = 60.0
+
+
+class ShedError(Exception):
+    """Raised when a run is rejected or evicted because the backend is overloaded."""
+
+
+def classify(
+    tenant: str,
+    requested: str | None,
+    priorities: dict[str, str] = TENANT_PRIORITIES,
+) -> str:
+    """
+    Resolve the priority for *tenant*'s request.
+
+    The ``X-Priority`` header (*requested*) may lower a tenant's priority but
+    never raise it above the ceiling configured in *priorities*. Tenants that
+    are not configured are capped at ``default``, which is also what a request
+    without the header gets.
+    """
+    ceiling = priorities.get(tenant, DEFAULT)
+    if ceiling not in PRIORITY_WEIGHTS:
+        ceiling = DEFAULT
+    priority = requested if requested in PRIORITY_WEIGHTS else DEFAULT
+    if PRIORITY_WEIGHTS[priority] > PRIORITY_WEIGHTS[ceiling]:
+        return ceiling
+    return priority
+
+
+# ── Scheduler ──────────────────────────────────────────────────────────────────
+
+
+@dataclass(eq=False)
+class Ticket:
+    tenant: str
+    priority: str
+    sheddable: bool
+    start_tag: float = 0.0
+    seq: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted: asyncio.Future | None = None
+    queued: bool = False
+
+    @property
+    def weight(self) -> float:
+        return PRIORITY_WEIGHTS[self.priority]
+
+
+@dataclass
+class TenantStats:
+    queued: int = 0
+    running: int = 0
+    admitted: int = 0
+    shed: int = 0
+    waits: deque[float] = field(default_factory=lambda: deque(maxlen=_WAIT_SAMPLES))
+    last_active: float = field(default_factory=time.monotonic)
+
+    def as_dict(self) -> dict:
+        ordered = sorted(self.waits)
+
+        def pct(q: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[int(q * (len(ordered) - 1))], 4)
+
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "wait_p50_seconds": pct(0.50),
+            "wait_p95_seconds": pct(0.95),
+            "wait_max_seconds": pct(1.0),
+        }
+
+
+class FairScheduler:
+    """Start-time fair queuing over ``(tenant, priority)`` flows."""
+
+    def __init__(
+        self,
+        max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+        max_queued: int = SCHEDULER_MAX_QUEUED,
+        max_queued_per_tenant: int = SCHEDULER_MAX_QUEUED_PER_TENANT,
+        reserved_slots: int = SCHEDULER_RESERVED_SLOTS,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_queued_per_tenant = max_queued_per_tenant or max(max_queued // 4, 1)
+        self.reserved_slots = max(min(reserved_slots, max_concurrent - 1), 0)
+        self._running = 0
+        self._queued = 0
+        self._heaps: dict[str, list[tuple[float, int, Ticket]]] = {
+            priority: [] for priority in PRIORITY_WEIGHTS
+        }
+        # Queued sheddable runs, in total and per flow; the shedding limits
+        # apply to these only.
+        self._sheddable = 0
+        self._backlog: Counter[tuple[str, str]] = Counter()
+        self._virtual_time = 0.0
+        self._last_finish: dict[tuple[str, str], float] = {}
+        self._seq = itertools.count()
+        self._stats: dict[str, TenantStats] = defaultdict(TenantStats)
+        self._next_sweep = time.monotonic() + _SWEEP_SECONDS
+
+    def submit(self, tenant: str, priority: str, sheddable: bool = True) -> Ticket:
+        """
+        Admit a run or raise ``ShedError``. Non-sheddable runs (background jobs)
+        always wait for a slot and are never evicted.
+        """
+        self._sweep()
+        ticket = Ticket(tenant, priority, sheddable)
+        flow = (tenant, priority)
+        ticket.start_tag = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        ticket.seq = next(self._seq)
+        ticket.granted = asyncio.get_running_loop().create_future()
+
+        if sheddable and self._running >= self._limit(priority):
+            try:
+                victim = self._victim(tenant, priority)
+            except ShedError:
+                stats = self._stats[tenant]
+                stats.shed += 1
+                stats.last_active = time.monotonic()
+                raise
+            if victim is not None:
+                self._evict(victim)
+
+        self._commit(ticket)
+        self._enqueue(ticket)
+        self._dispatch()
+        return ticket
+
+    def would_shed(self, tenant: str, priority: str) -> bool:
+        """Whether a sheddable run of *priority* from *tenant* would be rejected."""
+        if self._running < self._limit(priority):
+            return False
+        try:
+            self._victim(tenant, priority)
+        except ShedError:
+            return True
+        return False
+
+    @asynccontextmanager
+    async def run(self, ticket: Ticket) -> AsyncIterator[None]:
+        """Wait for *ticket*'s slot, hold it for the body, then release it."""
+        try:
+            await asyncio.shield(ticket.granted)
+        except asyncio.CancelledError:
+            if ticket.queued:
+                self._dequeue(ticket)
+            elif ticket.granted.done() and not ticket.granted.exception():
+                self._release(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def slot(
+        self, tenant: str, priority: str, sheddable: bool = True
+    ) -> AsyncIterator[None]:
+        """``submit`` + ``run`` in one step."""
+        async with self.run(self.submit(tenant, priority, sheddable)):
+            yield
+
+    def metrics(self) -> dict:
+        return {
+            "running": self._running,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "max_queued_per_tenant": self.max_queued_per_tenant,
+            "reserved_slots": self.reserved_slots,
+            "tenants": {
+                tenant: stats.as_dict() for tenant, stats in sorted(self._stats.items())
+            },
+        }
+
+    # ── Internals ──────────────────────────────────────────────────────────────
+
+    def _limit(self, priority: str) -> int:
+        """Slots a run of *priority* may start in."""
+        if priority == INTERACTIVE:
+            return self.max_concurrent
+        return self.max_concurrent - self.reserved_slots
+
+    def _victim(self, tenant: str, priority: str) -> Ticket | None:
+        """
+        The queued run to evict so a new run of *priority* fits, ``None`` if it
+        fits as is. Raises ``ShedError`` if the new run has to be rejected.
+        """
+        queued = sum(self._backlog[(tenant, p)] for p in PRIORITY_WEIGHTS)
+        if queued >= self.max_queued_per_tenant:
+            raise ShedError(f"Overloaded: too many queued requests from {tenant}.")
+        if self._sheddable < self.max_queued * SHED_THRESHOLDS[priority]:
+            return None
+        victim = self._eviction_candidate(tenant, priority)
+        if victim is None:
+            raise ShedError(f"Overloaded: {priority} request from {tenant} shed.")
+        return victim
+
+    def _eviction_candidate(self, tenant: str, priority: str) -> Ticket | None:
+        """
+        Most recently queued sheddable run of the lowest priority below
+        *priority*; failing that, the newest run of the tenant whose backlog at
+        *priority* is larger than *tenant*'s would be after admission.
+        """
+        weight = PRIORITY_WEIGHTS[priority]
+        queued = [
+            t
+            for heap in self._heaps.values()
+            for _, _, t in heap
+            if t.queued and t.sheddable
+        ]
+        lower = [t for t in queued if t.weight < weight]
+        if lower:
+            return min(lower, key=lambda t: (t.weight, -t.seq))
+
+        own = self._backlog[(tenant, priority)]
+        heavier = [
+            t
+            for t in queued
+            if t.priority == priority and self._backlog[(t.tenant, priority)] > own + 1
+        ]
+        if not heavier:
+            return None
+        return max(heavier, key=lambda t: (self._backlog[(t.tenant, priority)], t.seq))
+
+    def _commit(self, ticket: Ticket) -> None:
+        flow = (ticket.tenant, ticket.priority)
+        self._last_finish[flow] = ticket.start_tag + 1.0 / ticket.weight
+
+    def _enqueue(self, ticket: Ticket) -> None:
+        ticket.queued = True
+        self._queued += 1
+        self._stats[ticket.tenant].queued += 1
+        if ticket.sheddable:
+            self._sheddable += 1
+            self._backlog[(ticket.tenant, ticket.priority)] += 1
+        heapq.heappush(
+            self._heaps[ticket.priority], (ticket.start_tag, ticket.seq, ticket)
+        )
+
+    def _dequeue(self, ticket: Ticket) -> None:
+        # Lazy deletion: the heap entry is skipped once ``queued`` is False.
+        ticket.queued = False
+        self._queued -= 1
+        self._stats[ticket.tenant].queued -= 1
+        if ticket.sheddable:
+            self._sheddable -= 1
+            flow = (ticket.tenant, ticket.priority)
+            self._backlog[flow] -= 1
+            if not self._backlog[flow]:
+                del self._backlog[flow]
+
+    def _dispatch(self) -> None:
+        """Start queued runs, lowest start tag first, while slots allow."""
+        while True:
+            best: tuple[float, int, Ticket] | None = None
+            for priority, heap in self._heaps.items():
+                while heap and not heap[0][2].queued:
+                    heapq.heappop(heap)
+                if not heap or self._running >= self._limit(priority):
+                    continue
+                if best is None or heap[0][:2] < best[:2]:
+                    best = heap[0]
+            if best is None:
+                return
+            ticket = heapq.heappop(self._heaps[best[2].priority])[2]
+            self._dequeue(ticket)
+            self._start(ticket)
+
+    def _start(self, ticket: Ticket) -> None:
+        stats = self._stats[ticket.tenant]
+        stats.admitted += 1
+        stats.running += 1
+        stats.last_active = time.monotonic()
+        stats.waits.append(stats.last_active - ticket.enqueued_at)
+        self._running += 1
+        self._virtual_time = max(self._virtual_time, ticket.start_tag)
+        ticket.granted.set_result(None)
+
+    def _evict(self, victim: Ticket) -> None:
+        self._dequeue(victim)
+        self._stats[victim.tenant].shed += 1
+        victim.granted.set_exception(
+            ShedError(f"Overloaded: queued {victim.priority} request evicted.")
+        )
+
+    def _release(self, ticket: Ticket) -> None:
+        self._running -= 1
+        stats = self._stats[ticket.tenant]
+        stats.running -= 1
+        stats.last_active = time.monotonic()
+        self._dispatch()
+
+    def _sweep(self) -> None:
+        """Forget idle tenants and flows whose finish tag has fallen behind."""
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + _SWEEP_SECONDS
+        # A finish tag at or below virtual time no longer affects start tags.
+        self._last_finish = {
+            flow: tag
+            for flow, tag in self._last_finish.items()
+            if tag > self._virtual_time
+        }
+        for tenant, stats in list(self._stats.items()):
+            idle = not stats.queued and not stats.running
+            if idle and now - stats.last_active > _STATS_TTL_SECONDS:
+                del self._stats[tenant]
+
+
+scheduler = FairScheduler()
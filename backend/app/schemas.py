@@ -8,3 +8,18 @@ class QueryRequest(BaseModel):
 class ToolInfo(BaseModel):
     name: str
     description: str
+
+
+class JobInfo(BaseModel):
+    id: str
+    query: str
+    client_id: str = "anonymous"
+    status: str
+    created_at: float
+    updated_at: float
+    event_count: int = 0
+
+
+class JobEvent(BaseModel):
+    seq: int
+    event: dict
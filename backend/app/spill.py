@@ -0,0 +1,9 @@
+"""
+Names shared by the tool-output spill store (``app.trimming``) and the event
+log. Kept free of LangChain imports so the offline ``agent-analytics`` tool
+does not need the agent's dependencies.
+"""
+
+# Name of the spill reader tool and the prefix of its reply on a store miss.
+SPILL_READER_TOOL = "read_tool_output"
+SPILL_MISS_PREFIX = "No stored output"
@@ -1,9 +1,12 @@
 from typing import ClassVar
 
+from app.jobs import JobManager
+
 
 class AppState:
     tools: ClassVar[list] = []
     tools_loaded: ClassVar[bool] = False
+    jobs: ClassVar[JobManager] = JobManager()
 
 
 state = AppState()
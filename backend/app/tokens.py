@@ -0,0 +1,214 @@
+"""
+Token accounting — count prompt/completion tokens locally and enforce budgets.
+
+Tokens are counted with the model's own ``tokenizer.json`` loaded through the
+``tokenizers`` library, so no request ever leaves the process just to be
+measured. If the tokenizer cannot be loaded (offline, gated repo …) a
+~4-characters-per-token estimate is used instead.
+
+Budgets (``0`` disables a limit):
+    TOKEN_BUDGET_PER_REQUEST     — max prompt + completion tokens for one query
+    TOKEN_BUDGET_PER_CLIENT      — max tokens per client within the window
+    TOKEN_BUDGET_WINDOW_SECONDS  — length of the per-client window
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from functools import cache
+from itertools import pairwise
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_REPO_ID = os.getenv("TOKENIZER_REPO_ID", "Qwen/Qwen2.5-72B-Instruct")
+TOKEN_BUDGET_PER_REQUEST = int(os.getenv("TOKEN_BUDGET_PER_REQUEST", "0"))
+TOKEN_BUDGET_PER_CLIENT = int(os.getenv("TOKEN_BUDGET_PER_CLIENT", "0"))
+TOKEN_BUDGET_WINDOW_SECONDS = float(os.getenv("TOKEN_BUDGET_WINDOW_SECONDS", "86400"))
+
+# Chat templates wrap every message in role/separator tokens.
+_MESSAGE_OVERHEAD_TOKENS = 4
+_CHARS_PER_TOKEN = 4
+
+
+class BudgetExceededError(Exception):
+    """Raised when a request or client runs out of token budget."""
+
+
+# ── Tokenizer ──────────────────────────────────────────────────────────────────
+
+
+@cache
+def load_tokenizer():
+    """Load (once) the local tokenizer, or ``None`` to fall back to estimates."""
+    try:
+        from tokenizers import Tokenizer
+
+        return Tokenizer.from_pretrained(TOKENIZER_REPO_ID)
+    except Exception as exc:
+        logger.warning(
+            "Tokenizer %s unavailable (%s) — estimating token counts.",
+            TOKENIZER_REPO_ID,
+            exc,
+        )
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tokenizer = load_tokenizer()
+    if tokenizer is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def split_tokens(text: str, max_tokens: int) -> list[str]:
+    """Split *text* into consecutive chunks of at most *max_tokens* tokens each."""
+    if not text:
+        return []
+    max_tokens = max(max_tokens, 1)
+    tokenizer = load_tokenizer()
+    if tokenizer is None:
+        size = max_tokens * _CHARS_PER_TOKEN
+        return [text[i : i + size] for i in range(0, len(text), size)]
+    # One encode for the whole text; chunks are cut at token end offsets.
+    offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+    cuts = [offsets[i][1] for i in range(max_tokens - 1, len(offsets) - 1, max_tokens)]
+    bounds = [0, *cuts, len(text)]
+    return [text[a:b] for a, b in pairwise(bounds) if b > a]
+
+
+def content_text(content: str | list) -> str:
+    """Flatten LangChain message content (str or content blocks) to text."""
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content:
+        if isinstance(block, dict):
+            parts.append(str(block.get("text", "")))
+        else:
+            parts.append(str(block))
+    return "\n".join(parts)
+
+
+def count_message_tokens(messages: Iterable[BaseMessage]) -> int:
+    total = 0
+    for message in messages:
+        total += _MESSAGE_OVERHEAD_TOKENS + count_tokens(content_text(message.content))
+        if isinstance(message, AIMessage) and message.tool_calls:
+            total += count_tokens(json.dumps(message.tool_calls, default=str))
+    return total
+
+
+class MessageTokenCounter:
+    """
+    ``count_message_tokens`` with a per-message cache keyed by message id.
+
+    Every ReAct step resends the whole conversation; with the cache only the
+    messages added since the previous model call are tokenized. Messages
+    without an id (the system prompt) are counted every time.
+    """
+
+    def __init__(self) -> None:
+        self._counts: dict[str, int] = {}
+
+    def count(self, messages: Iterable[BaseMessage]) -> int:
+        total = 0
+        for message in messages:
+            if message.id is None:
+                total += count_message_tokens([message])
+                continue
+            tokens = self._counts.get(message.id)
+            if tokens is None:
+                tokens = self._counts[message.id] = count_message_tokens([message])
+            total += tokens
+        return total
+
+
+# ── Accounting ─────────────────────────────────────────────────────────────────
+
+
+@dataclass
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    model_calls: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def remaining(self, budget: int | None = None) -> int | None:
+        """Tokens left in the per-request *budget*, or ``None`` if unlimited."""
+        if budget is None:
+            budget = TOKEN_BUDGET_PER_REQUEST
+        if budget <= 0:
+            return None
+        return max(budget - self.total_tokens, 0)
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+
+class ClientBudgets:
+    """
+    Fixed-window token budgets keyed by client id.
+
+    Requests charge each model call as it happens, so concurrent requests from
+    one client all see the live balance. Windows that have ended are dropped.
+    """
+
+    def __init__(
+        self,
+        limit: int = TOKEN_BUDGET_PER_CLIENT,
+        window: float = TOKEN_BUDGET_WINDOW_SECONDS,
+    ) -> None:
+        self.limit = limit
+        self.window = window
+        self._used: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + window
+
+    def _current(self, client_id: str, now: float) -> tuple[float, int]:
+        start, used = self._used.get(client_id, (now, 0))
+        if now - start >= self.window:
+            start, used = now, 0
+        return start, used
+
+    def _sweep(self, now: float) -> None:
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.window
+        self._used = {
+            client_id: entry
+            for client_id, entry in self._used.items()
+            if now - entry[0] < self.window
+        }
+
+    def remaining(self, client_id: str) -> int | None:
+        if self.limit <= 0:
+            return None
+        with self._lock:
+            _, used = self._current(client_id, time.monotonic())
+        return max(self.limit - used, 0)
+
+    def charge(self, client_id: str, tokens: int) -> int | None:
+        """Charge *tokens* to *client_id* and return what is left of its budget."""
+        if self.limit <= 0:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            self._sweep(now)
+            start, used = self._current(client_id, now)
+            used += max(tokens, 0)
+            self._used[client_id] = (start, used)
+        return max(self.limit - used, 0)
+
+
+client_budgets = ClientBudgets()
@@ -0,0 +1,137 @@
+"""
+Adaptive context trimming for tool outputs.
+
+Oversized ``ToolMessage`` contents are cut down before they are fed back to the
+model. The full output is split into token-bounded pages and spilled to an
+in-memory side store; the model only sees the first page plus a pointer it can
+follow with the ``read_tool_output`` tool.
+
+The side store is not persisted. Refs end up in the conversation and thus in
+job checkpoints, but a job resumed after a restart gets a "No stored output"
+reply for pages spilled before the restart and has to call the tool again.
+
+The per-output limit shrinks as the request's token budget is consumed, so late
+ReAct steps do not blow the remaining budget on a single tool result.
+
+    TOOL_OUTPUT_MAX_TOKENS   — max tokens of a tool output passed to the model
+    TOOL_OUTPUT_PAGE_TOKENS  — size of each spilled page
+    TOOL_OUTPUT_STORE_SIZE   — number of spilled outputs kept (LRU)
+"""
+
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+
+from app.spill import SPILL_MISS_PREFIX, SPILL_READER_TOOL
+from app.tokens import TokenUsage, content_text, count_tokens, split_tokens
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import tool
+
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "2000"))
+TOOL_OUTPUT_PAGE_TOKENS = int(os.getenv("TOOL_OUTPUT_PAGE_TOKENS", "1000"))
+TOOL_OUTPUT_STORE_SIZE = int(os.getenv("TOOL_OUTPUT_STORE_SIZE", "256"))
+
+# Never trim below this many tokens, however little budget is left.
+_MIN_OUTPUT_TOKENS = 200
+# Share of the remaining request budget a single tool output may take.
+_BUDGET_SHARE = 4
+
+
+# ── Side store ─────────────────────────────────────────────────────────────────
+
+
+class SpillStore:
+    """Bounded LRU of paged tool outputs."""
+
+    def __init__(self, capacity: int = TOOL_OUTPUT_STORE_SIZE) -> None:
+        self.capacity = capacity
+        self._pages: OrderedDict[str, list[str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, pages: list[str]) -> str:
+        ref = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._pages[ref] = pages
+            while len(self._pages) > self.capacity:
+                self._pages.popitem(last=False)
+        return ref
+
+    def get(self, ref: str) -> list[str] | None:
+        with self._lock:
+            pages = self._pages.get(ref)
+            if pages is not None:
+                self._pages.move_to_end(ref)
+            return pages
+
+
+spill_store = SpillStore()
+
+
+@tool(SPILL_READER_TOOL)
+def read_tool_output(ref: str, page: int = 1) -> str:
+    """Read one page of a tool output that was truncated. Pages start at 1."""
+    pages = spill_store.get(ref)
+    if pages is None:
+        return f"{SPILL_MISS_PREFIX} for ref '{ref}' (it may have expired)."
+    if not 1 <= page <= len(pages):
+        return f"Page {page} out of range — output '{ref}' has pages 1..{len(pages)}."
+    return f"[Page {page}/{len(pages)} of '{ref}']\n{pages[page - 1]}"
+
+
+# ── Middleware ─────────────────────────────────────────────────────────────────
+
+
+class ToolOutputTrimmer(AgentMiddleware):
+    """Trim oversized tool outputs before the model sees them."""
+
+    def __init__(
+        self,
+        usage: TokenUsage | None = None,
+        max_tokens: int = TOOL_OUTPUT_MAX_TOKENS,
+        page_tokens: int = TOOL_OUTPUT_PAGE_TOKENS,
+        store: SpillStore = spill_store,
+    ) -> None:
+        super().__init__()
+        self.usage = usage
+        self.max_tokens = max_tokens
+        self.page_tokens = page_tokens
+        self.store = store
+
+    def _limit(self) -> int:
+        remaining = self.usage.remaining() if self.usage else None
+        if remaining is None:
+            return self.max_tokens
+        return max(min(self.max_tokens, remaining // _BUDGET_SHARE), _MIN_OUTPUT_TOKENS)
+
+    def trim(self, message: ToolMessage) -> ToolMessage:
+        if message.name == read_tool_output.name:
+            return message
+        text = content_text(message.content)
+        tokens = count_tokens(text)
+        limit = self._limit()
+        if tokens <= limit:
+            return message
+
+        pages = split_tokens(text, min(self.page_tokens, limit))
+        ref = self.store.put(pages)
+        message.content = (
+            f"{pages[0]}\n\n[Page 1/{len(pages)} shown: output truncated from "
+            f"{tokens} tokens. Call {read_tool_output.name} with ref='{ref}' and "
+            f"page=2..{len(pages)} to read the rest.]"
+        )
+        return message
+
+    def wrap_tool_call(self, request, handler: Callable):
+        result = handler(request)
+        return self.trim(result) if isinstance(result, ToolMessage) else result
+
+    async def awrap_tool_call(self, request, handler: Callable[..., Awaitable]):
+        result = await handler(request)
+        if not isinstance(result, ToolMessage):
+            return result
+        # Tokenizing a large output is CPU-bound; keep it off the event loop.
+        return await asyncio.to_thread(self.trim, result)
@@ -0,0 +1,168 @@
+"""
+Scheduler load test — interactive latency with and without bulk load.
+
+Simulated agent runs (exponential service times, no LLM or MCP involved) go
+through ``FairScheduler`` exactly as ``POST /query`` sends them: each client
+sends ``X-Client-Id`` / ``X-Priority`` headers, ``classify`` resolves them
+against ``TENANT_CONFIG`` and ``would_shed`` answers 503 before a slot is taken.
+
+Three open-loop UI tenants (configured ``interactive``) run first alone, then
+next to a closed-loop batch tenant (configured ``bulk``), then additionally
+next to an unconfigured tenant that floods the backend while claiming
+``X-Priority: interactive``. A FIFO run (everyone in one flow, unbounded queue,
+no reserved slots) is included for comparison. Each scenario is repeated for
+several seeds and the spread of interactive p95 across seeds is reported.
+
+Usage:
+    python loadtest.py [--duration 10] [--seeds 3] [--bulk-workers 40]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.scheduler import FairScheduler, ShedError, classify
+
+MAX_CONCURRENT = 4
+MAX_QUEUED = 64
+MEAN_SERVICE_SECONDS = 0.05
+INTERACTIVE_TENANTS = ("ui-1", "ui-2", "ui-3")
+INTERACTIVE_RATE = 10.0  # requests/second per interactive tenant
+
+TENANT_CONFIG = {
+    **{tenant: "interactive" for tenant in INTERACTIVE_TENANTS},
+    "batch": "bulk",
+}
+UI_HEADERS = {tenant: {"X-Priority": "interactive"} for tenant in INTERACTIVE_TENANTS}
+BATCH_HEADERS = {"X-Priority": "bulk"}
+# Unconfigured and self-promoting: classify() caps it at "default".
+NOISY_HEADERS = {"X-Priority": "interactive"}
+
+
+class Client:
+    """Sends simulated requests the way the /query router handles them."""
+
+    def __init__(
+        self,
+        scheduler: FairScheduler,
+        tenant: str,
+        headers: dict[str, str],
+        rng: random.Random,
+        fifo: bool = False,
+    ) -> None:
+        self.scheduler = scheduler
+        self.tenant = "all" if fifo else tenant
+        self.priority = classify(
+            self.tenant, None if fifo else headers.get("X-Priority"), TENANT_CONFIG
+        )
+        self.rng = rng
+        self.latencies: list[float] = []
+        self.completed = 0
+        self.shed = 0
+
+    async def request(self) -> None:
+        start = time.monotonic()
+        if self.scheduler.would_shed(self.tenant, self.priority):
+            self.shed += 1  # 503 before streaming starts
+            return
+        try:
+            async with self.scheduler.slot(self.tenant, self.priority):
+                service = self.rng.expovariate(1 / MEAN_SERVICE_SECONDS)
+                await asyncio.sleep(min(service, 0.5))
+        except ShedError:
+            self.shed += 1  # evicted while queued
+            return
+        self.completed += 1
+        self.latencies.append(time.monotonic() - start)
+
+    async def open_loop(self, rate: float, deadline: float) -> None:
+        tasks = []
+        while time.monotonic() < deadline:
+            tasks.append(asyncio.create_task(self.request()))
+            await asyncio.sleep(self.rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    async def closed_loop(self, workers: int, deadline: float) -> None:
+        async def worker() -> None:
+            while time.monotonic() < deadline:
+                shed = self.shed
+                await self.request()
+                if self.shed > shed:
+                    await asyncio.sleep(0.01)  # honour Retry-After, briefly
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def scenario(
+    duration: float,
+    seed: int,
+    bulk_workers: int = 0,
+    noisy_workers: int = 0,
+    fifo: bool = False,
+) -> dict:
+    rng = random.Random(seed)
+    if fifo:
+        scheduler = FairScheduler(MAX_CONCURRENT, 10**6, 10**6, reserved_slots=0)
+    else:
+        scheduler = FairScheduler(MAX_CONCURRENT, MAX_QUEUED)
+    deadline = time.monotonic() + duration
+
+    ui = [Client(scheduler, t, UI_HEADERS[t], rng, fifo) for t in INTERACTIVE_TENANTS]
+    batch = Client(scheduler, "batch", BATCH_HEADERS, rng, fifo)
+    noisy = Client(scheduler, "api-heavy", NOISY_HEADERS, rng, fifo)
+    await asyncio.gather(
+        *(client.open_loop(INTERACTIVE_RATE, deadline) for client in ui),
+        batch.closed_loop(bulk_workers, deadline),
+        noisy.closed_loop(noisy_workers, deadline),
+    )
+
+    latencies = [lat for client in ui for lat in client.latencies]
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "interactive_requests": len(latencies),
+        "interactive_shed": sum(client.shed for client in ui),
+        "interactive_p50_ms": quantiles[49] * 1000,
+        "interactive_p95_ms": quantiles[94] * 1000,
+        "background_completed": batch.completed + noisy.completed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--bulk-workers", type=int, default=40)
+    args = parser.parse_args()
+
+    workers = args.bulk_workers
+    runs = {
+        "interactive only": {},
+        "+ bulk (WFQ)": {"bulk_workers": workers},
+        "+ bulk + noisy (WFQ)": {"bulk_workers": workers, "noisy_workers": workers},
+        "+ bulk (FIFO)": {"bulk_workers": workers, "fifo": True},
+    }
+    print(
+        f"{'scenario':<24}{'reqs':>7}{'503s':>6}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'p95 range':>15}{'bg done':>9}"
+    )
+    for label, kwargs in runs.items():
+        results = [
+            asyncio.run(scenario(args.duration, seed, **kwargs))
+            for seed in range(args.seeds)
+        ]
+        p95s = [r["interactive_p95_ms"] for r in results]
+        print(
+            f"{label:<24}"
+            f"{sum(r['interactive_requests'] for r in results):>7}"
+            f"{sum(r['interactive_shed'] for r in results):>6}"
+            f"{statistics.mean(r['interactive_p50_ms'] for r in results):>9.1f}"
+            f"{statistics.mean(p95s):>9.1f}"
+            f"{f'{min(p95s):.0f}-{max(p95s):.0f}':>15}"
+            f"{sum(r['background_completed'] for r in results):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
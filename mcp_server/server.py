@@ -1,4 +1,6 @@
-from fastmcp import FastMCP
+import asyncio
+
+from fastmcp import Context, FastMCP
 
 # 1. Initialize the FastMCP server
 mcp = FastMCP("MCPServer")
@@ -11,13 +13,31 @@ def add_numbers(a: int, b: int) -> int:
     return a + b
 
 
-# 3. Define a Resource (Data the AI can read)
+# Each section takes a second; cap the count so one call cannot run for ages.
+MAX_REPORT_SECTIONS = 20
+
+
+# 3. Define a long-running Tool that streams its output as progress notifications
+@mcp.tool()
+async def generate_report(ctx: Context, topic: str, sections: int = 5) -> str:
+    """Writes a report on a topic (1-20 sections), one section at a time."""
+    sections = max(1, min(sections, MAX_REPORT_SECTIONS))
+    lines = []
+    for i in range(1, sections + 1):
+        await asyncio.sleep(1)
+        line = f"Section {i}/{sections} on {topic}: analysis complete."
+        lines.append(line)
+        await ctx.report_progress(progress=i, total=sections, message=line)
+    return "\n".join(lines)
+
+
+# 4. Define a Resource (Data the AI can read)
 @mcp.resource("info://about")
 def get_info() -> str:
     """Provides information about this server."""
     return "This is a simple MCP server running in Python!"
 
 
-# 4. Run the server using the standard input/output transport
+# 5. Run the server using the standard input/output transport
 if __name__ == "__main__":
     mcp.run(transport="http", host="0.0.0.0", port=8000)
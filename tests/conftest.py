@@ -0,0 +1,56 @@
+import pytest
+
+
+@pytest.fixture
+def estimated_tokens(monkeypatch) -> None:
+    """Count tokens with the ~4-chars-per-token estimate; no tokenizer download."""
+    tokens = pytest.importorskip("app.tokens")
+    monkeypatch.setattr(tokens, "load_tokenizer", lambda: None)
+
+
+@pytest.fixture
+def fake_model(monkeypatch, estimated_tokens):
+    """
+    Replace the agent's LLM with a scripted one.
+
+    ``fake_model(*turns)`` installs a model whose n-th reply (counted from the
+    AI messages already in the conversation, so resumed threads pick up where
+    they left off) is ``turns[n]``: a string is a final answer, a
+    ``(tool, args)`` pair a single tool call. The model is returned; its
+    ``calls`` list holds the messages of every request it received.
+    """
+    agent = pytest.importorskip("app.agent")
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import AIMessage, BaseMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from pydantic import Field
+
+    class ScriptedChatModel(BaseChatModel):
+        turns: list
+        calls: list[list[BaseMessage]] = Field(default_factory=list)
+
+        @property
+        def _llm_type(self) -> str:
+            return "scripted"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            self.calls.append(messages)
+            step = sum(isinstance(m, AIMessage) for m in messages)
+            turn = self.turns[step]
+            if isinstance(turn, str):
+                message = AIMessage(content=turn)
+            else:
+                name, args = turn
+                call = {"name": name, "args": args, "id": f"call-{step}"}
+                message = AIMessage(content="", tool_calls=[call])
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def install(*turns) -> ScriptedChatModel:
+        model = ScriptedChatModel(turns=list(turns))
+        monkeypatch.setattr(agent, "_build_llm", lambda: model)
+        return model
+
+    return install
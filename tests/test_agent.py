@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_mcp_adapters")
+
+from app import agent, resilience
+from app.agent import run_agent_stream
+from app.mcp_client import _on_progress
+from app.resilience import CircuitBreaker, breakers
+from langchain_core.tools import tool
+from langchain_mcp_adapters.callbacks import CallbackContext
+
+
+def _run(query: str, tools: list) -> list[dict]:
+    async def main() -> list[dict]:
+        return [event async for event in run_agent_stream(query, tools)]
+
+    return asyncio.run(main())
+
+
+def _types(events: list[dict]) -> list[str]:
+    return [event["type"] for event in events]
+
+
+@pytest.fixture
+def fresh_breaker(monkeypatch):
+    """Register a clean breaker for an MCP tool name for the test's duration."""
+
+    def register(name: str, **kwargs) -> CircuitBreaker:
+        breaker = CircuitBreaker(f"mcp:{name}", slow_call_seconds=10.0, **kwargs)
+        monkeypatch.setitem(breakers, f"mcp:{name}", breaker)
+        return breaker
+
+    return register
+
+
+# ── Resilience ─────────────────────────────────────────────────────────────────
+
+
+def test_hedged_call_is_reported_once(fake_model, fresh_breaker, monkeypatch) -> None:
+    breaker = fresh_breaker("hedged_search")
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        breaker.sample(0.01)
+    monkeypatch.setattr(resilience, "HEDGED_TOOLS", frozenset({"hedged_search"}))
+    fake_model(("hedged_search", {"query": "q"}), "done")
+    attempts = 0
+
+    @tool
+    async def hedged_search(query: str) -> str:
+        """Search, slowly the first time."""
+        nonlocal attempts
+        attempts += 1
+        attempt = attempts
+        context = CallbackContext(server_name="test", tool_name="hedged_search")
+        await _on_progress(0, 1, f"attempt {attempt}", context)
+        await asyncio.sleep(0.2 if attempt == 1 else 0)
+        return f"result {attempt}"
+
+    events = _run("q", [hedged_search])
+
+    assert attempts == 2
+    assert _types(events) == ["tool_call", "tool_progress", "tool_result", "answer"]
+    assert events[1]["content"]["message"] == "attempt 1"
+    assert events[2]["content"] == {"tool": "hedged_search", "output": "result 2"}
+
+
+def test_failed_and_rejected_calls_end_with_error_results(
+    fake_model, fresh_breaker
+) -> None:
+    breaker = fresh_breaker("flaky_search", min_calls=1, failure_rate=1.0)
+    fake_model(("flaky_search", {"query": "a"}), ("flaky_search", {"query": "b"}), "x")
+
+    @tool
+    async def flaky_search(query: str) -> str:
+        """Search a backend that is down."""
+        raise RuntimeError("backend down")
+
+    events = _run("q", [flaky_search])
+
+    assert breaker.state == resilience.OPEN
+    assert _types(events) == ["tool_call", "tool_result", "tool_result", "answer"]
+    failed, rejected = events[1]["content"], events[2]["content"]
+    assert failed["status"] == rejected["status"] == "error"
+    assert "backend down" in failed["output"]
+    assert "temporarily unavailable" in rejected["output"]
+    assert rejected["tool"] == "flaky_search"
+
+
+# ── Streaming ──────────────────────────────────────────────────────────────────
+
+
+def test_large_tool_outputs_are_sent_in_chunks(fake_model, monkeypatch) -> None:
+    monkeypatch.setattr(agent, "TOOL_RESULT_CHUNK_CHARS", 10)
+    fake_model(("digits", {"count": 23}), ("digits", {"count": 10}), "done")
+
+    @tool
+    def digits(count: int) -> str:
+        """Return *count* digits."""
+        return "".join(str(i % 10) for i in range(count))
+
+    events = _run("q", [digits])
+
+    assert _types(events) == [
+        "tool_call",
+        *["tool_progress"] * 3,
+        "tool_result",
+        "tool_call",
+        "tool_result",
+        "answer",
+    ]
+    chunks = [event["content"] for event in events[1:4]]
+    assert chunks == [
+        {"tool": "digits", "chunk": i, "chunks": 3, "output": output}
+        for i, output in enumerate(["0123456789", "0123456789", "012"])
+    ]
+    assert events[4]["content"] == {"tool": "digits", "output": "", "chunks": 3}
+    # Outputs of exactly TOOL_RESULT_CHUNK_CHARS are sent whole.
+    assert events[6]["content"] == {"tool": "digits", "output": "0123456789"}
+
+
+def test_mcp_progress_is_forwarded_as_tool_progress(fake_model) -> None:
+    fake_model(("report", {"topic": "t"}), "done")
+
+    @tool
+    async def report(topic: str) -> str:
+        """Write a two-part report."""
+        context = CallbackContext(server_name="test", tool_name="report")
+        for part in (1, 2):
+            await _on_progress(part, 2, f"part {part}", context)
+        return "report"
+
+    events = _run("q", [report])
+
+    assert _types(events) == [
+        "tool_call",
+        "tool_progress",
+        "tool_progress",
+        "tool_result",
+        "answer",
+    ]
+    assert events[1]["content"] == {
+        "tool": "report",
+        "progress": 1,
+        "total": 2,
+        "message": "part 1",
+    }
+    assert events[2]["content"]["message"] == "part 2"
+
+
+def test_progress_outside_a_run_is_dropped() -> None:
+    context = CallbackContext(server_name="test", tool_name="report")
+    assert asyncio.run(_on_progress(1, None, None, context)) is None
@@ -0,0 +1,173 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app import eventlog  # noqa: E402
+from app.analytics import Report, aggregate, read_blocks  # noqa: E402
+from app.eventlog import (  # noqa: E402
+    FLAG_CACHE_HIT,
+    FLAG_CACHE_MISS,
+    KINDS,
+    EventLog,
+    RunRecorder,
+    encode_block,
+)
+
+_KIND = {kind: code for code, kind in enumerate(KINDS)}
+NAN = math.nan
+
+
+def _record(ts, run, kind, step=0, tool="", duration=NAN, tokens=0, flags=0):
+    return (ts, run, ts - 100.0, _KIND[kind], step, tool, duration, tokens, flags)
+
+
+# Run 1 calls the calculator once and answers; run 2 reads a spilled output
+# twice (one hit, one miss) and fails.
+BLOCK_1 = [
+    _record(100.0, 1, "thinking"),
+    _record(100.5, 1, "tool_call", step=1, tool="calculate"),
+    _record(101.0, 1, "tool_result", step=1, tool="calculate", duration=0.5),
+    _record(102.0, 1, "answer", step=1, duration=2.0, tokens=100),
+]
+BLOCK_2 = [
+    _record(200.0, 2, "tool_call", step=1, tool="read_tool_output"),
+    _record(200.1, 2, "tool_result", 1, "read_tool_output", 0.1, 0, FLAG_CACHE_HIT),
+    _record(201.0, 2, "tool_call", step=2, tool="read_tool_output"),
+    _record(201.3, 2, "tool_result", 2, "read_tool_output", 0.3, 0, FLAG_CACHE_MISS),
+    _record(204.0, 2, "error", step=2, duration=4.0, tokens=50),
+]
+
+
+def test_blocks_round_trip(tmp_path) -> None:
+    path = tmp_path / "events-1.evlog"
+    path.write_bytes(encode_block(BLOCK_1) + encode_block(BLOCK_2))
+
+    blocks = list(read_blocks(path))
+    assert len(blocks) == 2
+    names, columns = blocks[1]
+    assert names == ["read_tool_output"]
+    assert columns["run"].tolist() == [2] * 5
+    assert columns["kind"].tolist() == [2, 4, 2, 4, 6]
+    assert columns["tool"].tolist() == [1, 1, 1, 1, 0]
+    assert columns["flags"].tolist() == [0, 1, 0, 2, 0]
+    assert columns["tokens"].tolist() == [0, 0, 0, 0, 50]
+    assert columns["ts"].tolist() == [200.0, 200.1, 201.0, 201.3, 204.0]
+    assert np.isnan(columns["duration"][0])
+    assert columns["duration"][3] == pytest.approx(0.3)
+
+
+def test_truncated_block_is_skipped(tmp_path) -> None:
+    path = tmp_path / "events-1.evlog"
+    path.write_bytes(encode_block(BLOCK_1) + encode_block(BLOCK_2)[:-3])
+    assert len(list(read_blocks(path))) == 1
+
+
+def test_report_from_known_events(tmp_path) -> None:
+    (tmp_path / "events-1.evlog").write_bytes(encode_block(BLOCK_1))
+    (tmp_path / "events-2.evlog").write_bytes(encode_block(BLOCK_2))
+
+    data = aggregate(tmp_path).as_dict()
+
+    assert data["files"] == 2
+    assert data["events"] == 9
+    assert data["first_ts"] == 100.0
+    assert data["last_ts"] == 204.0
+    assert data["events_by_kind"] == {
+        "other": 0,
+        "thinking": 1,
+        "tool_call": 3,
+        "tool_progress": 0,
+        "tool_result": 3,
+        "answer": 1,
+        "error": 1,
+    }
+    assert data["runs"] == 2
+    assert data["runs_failed"] == 1
+    assert data["steps"] == {"mean": 1.5, "histogram": {"1": 1, "2": 1}}
+    assert data["tokens"] == {"total": 150, "mean_per_run": 75.0}
+    assert data["spill_cache"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    latency = data["run_latency_seconds"]
+    assert latency["count"] == 2
+    assert latency["mean"] == pytest.approx(3.0)
+    # Percentiles are bin edges, accurate to one ~7 % bin.
+    assert latency["p50"] == pytest.approx(2.0, rel=0.08)
+    assert latency["p99"] == pytest.approx(4.0, rel=0.08)
+
+    tools = data["tools"]
+    assert list(tools) == ["read_tool_output", "calculate"]
+    assert tools["read_tool_output"]["calls"] == 2
+    assert tools["read_tool_output"]["latency_seconds"]["count"] == 2
+    assert tools["read_tool_output"]["latency_seconds"]["mean"] == pytest.approx(0.2)
+    assert tools["calculate"]["calls"] == 1
+    assert tools["calculate"]["latency_seconds"]["p50"] == pytest.approx(0.5, rel=0.08)
+
+
+def test_empty_report() -> None:
+    data = Report().as_dict()
+    assert data["runs"] == 0
+    assert data["run_latency_seconds"]["p95"] is None
+    assert data["spill_cache"]["hit_rate"] is None
+
+
+def test_recorded_run_is_written_and_aggregated(tmp_path) -> None:
+    log = EventLog(str(tmp_path), flush_seconds=0.01)
+    log.start()
+    recorder = log.recorder()
+    for event in [
+        {"type": "thinking", "content": "..."},
+        {
+            "type": "tool_call",
+            "content": {"tool": "read_tool_output", "input": {}},
+            "run_id": "r1",
+        },
+        {
+            "type": "tool_result",
+            "content": {"tool": "read_tool_output", "output": "[Page 2/3] ..."},
+            "run_id": "r1",
+        },
+        {"type": "answer", "content": "42", "usage": {"total_tokens": 321}},
+    ]:
+        recorder.record(event)
+    log.stop()
+
+    data = aggregate(tmp_path).as_dict()
+    assert data["events"] == 4
+    assert data["runs"] == 1
+    assert data["steps"]["histogram"] == {"1": 1}
+    assert data["tokens"]["total"] == 321
+    assert data["tools"]["read_tool_output"]["calls"] == 1
+    assert data["tools"]["read_tool_output"]["latency_seconds"]["count"] == 1
+    assert data["spill_cache"] == {"hits": 1, "misses": 0, "hit_rate": 1.0}
+    assert log.dropped == 0
+
+
+def test_tool_latency_is_matched_by_run_id(monkeypatch) -> None:
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(
+        eventlog,
+        "time",
+        SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now),
+    )
+    records: list[tuple] = []
+    recorder = RunRecorder(SimpleNamespace(running=True, put=records.append))
+
+    def record(at: float, kind: str, run_id: str | None, **content) -> None:
+        clock.now = at
+        content = {"tool": "search", **content}
+        recorder.record({"type": kind, "content": content, "run_id": run_id})
+
+    # The first call never reports back; the next two overlap.
+    record(0.0, "tool_call", "a", input={})
+    record(10.0, "tool_call", "b", input={})
+    record(11.0, "tool_call", "c", input={})
+    record(11.5, "tool_result", "c", output="c")
+    record(13.0, "tool_result", "b", output="b", status="error")
+    record(14.0, "tool_result", None, output="rejected", status="error")
+
+    durations = [r[6] for r in records if r[3] == _KIND["tool_result"]]
+    assert durations[:2] == [0.5, 3.0]
+    assert math.isnan(durations[2])
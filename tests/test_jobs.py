@@ -0,0 +1,260 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+from app import jobs as jobs_module
+from app.jobs import FAILED, RUNNING, SUCCEEDED, JobManager
+from langchain_core.tools import tool
+
+
+@tool
+async def lookup(key: str) -> str:
+    """Look *key* up."""
+    return f"value of {key}"
+
+
+def _manager(tmp_path) -> JobManager:
+    return JobManager(
+        str(tmp_path / "jobs.sqlite3"), str(tmp_path / "checkpoints.sqlite3"), 1
+    )
+
+
+async def _wait_for(manager: JobManager, job_id: str, status: str) -> dict:
+    for _ in range(200):
+        job = await manager.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}: {job}")
+
+
+def _types(records: list[dict]) -> list[str]:
+    return [record["event"]["type"] for record in records]
+
+
+# ── Event log ──────────────────────────────────────────────────────────────────
+
+
+def test_events_keep_seq_order_across_batched_flushes(
+    tmp_path, monkeypatch, fake_model
+) -> None:
+    monkeypatch.setattr(jobs_module, "JOBS_FLUSH_EVENTS", 2)
+    fake_model(*[("lookup", {"key": f"k{i}"}) for i in range(4)], "done")
+
+    async def main() -> list[dict]:
+        manager = _manager(tmp_path)
+        await manager.start([lookup])
+        job = await manager.submit("look up four keys")
+        await _wait_for(manager, job["id"], SUCCEEDED)
+        records = await manager.events(job["id"])
+        await manager.stop()
+        return records
+
+    records = asyncio.run(main())
+    assert [record["seq"] for record in records] == list(range(1, 10))
+    assert _types(records) == [*["tool_call", "tool_result"] * 4, "answer"]
+    outputs = [r["event"]["content"]["output"] for r in records[1:-1:2]]
+    assert outputs == [f"value of k{i}" for i in range(4)]
+
+
+def test_status_is_set_after_the_flush(tmp_path, monkeypatch, fake_model) -> None:
+    # No timed flushes: only the status change may write the buffered events.
+    monkeypatch.setattr(jobs_module, "JOBS_FLUSH_SECONDS", 60.0)
+    fake_model(("lookup", {"key": "a"}), "done")
+    logged_at_status: dict[str, int] = {}
+
+    async def main() -> None:
+        manager = _manager(tmp_path)
+        await manager.start([lookup])
+        store = manager.store
+        set_status = store.set_status
+
+        def spy(job_id: str, status: str) -> None:
+            logged_at_status[status] = store.get_job(job_id)["event_count"]
+            set_status(job_id, status)
+
+        monkeypatch.setattr(store, "set_status", spy)
+        job = await manager.submit("look up a")
+        await _wait_for(manager, job["id"], SUCCEEDED)
+        await manager.stop()
+
+    asyncio.run(main())
+    assert logged_at_status == {RUNNING: 0, SUCCEEDED: 3}
+
+
+def test_follow_drains_the_log_then_stops(tmp_path, fake_model) -> None:
+    fake_model(("lookup", {"key": "a"}), "done")
+
+    async def main() -> list[dict]:
+        manager = _manager(tmp_path)
+        await manager.start([lookup])
+        job = await manager.submit("look up a")
+        records = [record async for record in manager.follow(job["id"], after=1)]
+        await manager.stop()
+        return records
+
+    records = asyncio.run(main())
+    assert [record["seq"] for record in records] == [2, 3]
+    assert _types(records) == ["tool_result", "answer"]
+
+
+# ── Restarts ───────────────────────────────────────────────────────────────────
+
+
+def test_terminal_event_without_status_finishes_without_rerunning(
+    tmp_path, fake_model
+) -> None:
+    model = fake_model()  # any model call would fail: there are no turns
+
+    async def main() -> dict:
+        # A previous process logged the answer but died before the status.
+        store = jobs_module.JobStore(str(tmp_path / "jobs.sqlite3"))
+        job = store.create_job("q", "anonymous")
+        store.append_events(job["id"], [{"type": "answer", "content": "42"}])
+        store.set_status(job["id"], RUNNING)
+        store.close()
+
+        manager = _manager(tmp_path)
+        await manager.start([])
+        finished = await _wait_for(manager, job["id"], SUCCEEDED)
+        await manager.stop()
+        return finished
+
+    job = asyncio.run(main())
+    assert job["event_count"] == 1
+    assert model.calls == []
+
+
+def test_stopped_job_resumes_from_its_checkpoint(tmp_path, fake_model) -> None:
+    model = fake_model(("slow_lookup", {"key": "a"}), "done")
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @tool
+    async def slow_lookup(key: str) -> str:
+        """Look *key* up, slowly."""
+        started.set()
+        await release.wait()
+        return f"value of {key}"
+
+    async def first_run() -> str:
+        manager = _manager(tmp_path)
+        await manager.start([slow_lookup])
+        job = await manager.submit("look up a")
+        await started.wait()
+        await manager.stop()  # cancels the run inside the tool call
+        return job["id"]
+
+    async def second_run(job_id: str) -> tuple[dict, list[dict]]:
+        release.set()
+        manager = _manager(tmp_path)
+        await manager.start([slow_lookup])
+        job = await _wait_for(manager, job_id, SUCCEEDED)
+        records = await manager.events(job_id)
+        await manager.stop()
+        return job, records
+
+    job_id = asyncio.run(first_run())
+    # A fresh loop, as after a process restart.
+    started, release = asyncio.Event(), asyncio.Event()
+    job, records = asyncio.run(second_run(job_id))
+
+    # The model is not asked again for the step checkpointed before the stop.
+    assert len(model.calls) == 2
+    assert _types(records) == ["tool_call", "tool_call", "tool_result", "answer"]
+    assert records[-1]["event"]["content"] == "done"
+    assert job["status"] == SUCCEEDED
+
+
+def test_crashed_run_marks_the_job_failed(tmp_path, monkeypatch) -> None:
+    async def crash(*args, **kwargs):
+        raise RuntimeError("boom")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(jobs_module, "run_agent_stream", crash)
+
+    async def main() -> list[dict]:
+        manager = _manager(tmp_path)
+        await manager.start([])
+        job = await manager.submit("q")
+        await _wait_for(manager, job["id"], FAILED)
+        records = await manager.events(job["id"])
+        await manager.stop()
+        return records
+
+    records = asyncio.run(main())
+    assert records == [{"seq": 1, "event": {"type": "error", "content": "boom"}}]
+
+
+# ── HTTP API ───────────────────────────────────────────────────────────────────
+
+
+@pytest.fixture
+def client_factory(tmp_path, monkeypatch):
+    """Build TestClients for an app serving the jobs router off a tmp manager."""
+    pytest.importorskip("httpx")
+    from contextlib import asynccontextmanager
+
+    from app.routers import jobs as jobs_router
+    from app.state import state
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    manager = _manager(tmp_path)
+    monkeypatch.setattr(state, "jobs", manager)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await manager.start([lookup])
+        yield
+        await manager.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(jobs_router.router)
+    return lambda: TestClient(app)
+
+
+def test_unknown_job_is_404(client_factory) -> None:
+    with client_factory() as client:
+        assert client.get("/jobs/nope").status_code == 404
+        assert client.get("/jobs/nope/events?stream=false").status_code == 404
+
+
+@pytest.mark.parametrize(
+    ("query", "headers"),
+    [
+        ("after=-1", {}),
+        ("limit=0", {}),
+        ("limit=5001", {}),
+        ("", {"Last-Event-ID": "abc"}),
+        ("", {"Last-Event-ID": "-1"}),
+    ],
+)
+def test_invalid_event_offsets_are_422(client_factory, query, headers) -> None:
+    # Parameters are validated before the job is looked up.
+    with client_factory() as client:
+        url = f"/jobs/nope/events?stream=false&{query}"
+        assert client.get(url, headers=headers).status_code == 422
+
+
+def test_jobs_run_across_app_restarts(client_factory, fake_model) -> None:
+    fake_model("done")
+    # Each TestClient runs the lifespan on a new event loop.
+    for _ in range(2):
+        with client_factory() as client:
+            job = client.post("/jobs", json={"query": "q"}).json()
+            for _ in range(200):
+                info = client.get(f"/jobs/{job['id']}").json()
+                if info["status"] == SUCCEEDED:
+                    break
+                time.sleep(0.01)
+            assert info["status"] == SUCCEEDED
+            events = client.get(
+                f"/jobs/{job['id']}/events",
+                params={"stream": "false"},
+                headers={"Last-Event-ID": "0"},
+            ).json()
+            assert [(e["seq"], e["event"]["content"]) for e in events] == [(1, "done")]
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from app.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilienceMiddleware,
+    breakers,
+    hedged,
+)
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    options = {
+        "slow_call_seconds": 1.0,
+        "window": 4,
+        "min_calls": 2,
+        "failure_rate": 0.5,
+        "reset_seconds": 0.05,
+        "half_open_calls": 1,
+    }
+    return CircuitBreaker("test", **{**options, **kwargs})
+
+
+# ── Circuit breaker ────────────────────────────────────────────────────────────
+
+
+def test_breaker_opens_half_opens_and_closes() -> None:
+    breaker = _breaker()
+    breaker.record(0.1, ok=False)
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.record(0.1, ok=False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker() -> None:
+    breaker = _breaker()
+    for _ in range(2):
+        breaker.record(0.1, ok=False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(0.1, ok=False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_slow_calls_count_as_failures() -> None:
+    breaker = _breaker(slow_call_seconds=0.5)
+    breaker.record(0.6)
+    breaker.record(0.7)
+    assert breaker.state == OPEN
+
+
+def test_guard_rejects_while_open_and_releases_cancelled_probes() -> None:
+    breaker = _breaker()
+    for _ in range(2):
+        breaker.record(0.1, ok=False)
+    with pytest.raises(CircuitOpenError), breaker.guard():
+        pass
+
+    time.sleep(0.06)
+    with pytest.raises(asyncio.CancelledError), breaker.guard():
+        raise asyncio.CancelledError
+    assert breaker.state == HALF_OPEN
+    assert breaker.available()  # the cancelled probe was handed back
+
+
+def test_guard_can_skip_latency_samples() -> None:
+    breaker = _breaker()
+    with breaker.guard(sample_latency=False):
+        pass
+    assert breaker.snapshot()["recent_calls"] == 1
+    assert not breaker._latencies
+
+
+# ── Hedging ────────────────────────────────────────────────────────────────────
+
+
+def test_hedged_returns_the_faster_duplicate() -> None:
+    calls = []
+    first_latency: list[float] = []
+
+    async def call() -> int:
+        calls.append(len(calls) + 1)
+        await asyncio.sleep(0.2 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    async def main() -> tuple[int, float]:
+        start = time.monotonic()
+        result = await hedged(call, 0.05, on_first=first_latency.append)
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0.25)  # let the first attempt finish
+        return result, elapsed
+
+    result, elapsed = asyncio.run(main())
+    assert result == 2
+    assert elapsed < 0.15
+    # The winner's latency is not reported; the slow first attempt's is.
+    assert first_latency == [pytest.approx(0.2, abs=0.05)]
+
+
+def test_hedged_does_not_duplicate_fast_calls() -> None:
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        return "ok"
+
+    assert asyncio.run(hedged(call, 0.05)) == "ok"
+    assert calls == 1
+
+
+def test_hedged_raises_when_every_attempt_fails() -> None:
+    async def call() -> None:
+        await asyncio.sleep(0.02)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError, match="down"):
+        asyncio.run(hedged(call, 0.01))
+
+
+# ── Middleware ─────────────────────────────────────────────────────────────────
+
+
+def _tool_request(name: str) -> SimpleNamespace:
+    return SimpleNamespace(tool_call={"name": name, "id": "call-1"})
+
+
+def test_middleware_turns_mcp_tool_errors_into_tool_messages() -> None:
+    middleware = ResilienceMiddleware(["test-flaky-tool"])
+
+    def handler(request) -> None:
+        raise RuntimeError("boom")
+
+    message = middleware.wrap_tool_call(_tool_request("test-flaky-tool"), handler)
+    assert message.status == "error"
+    assert "boom" in message.content
+
+
+def test_middleware_bypasses_breakers_for_local_tools() -> None:
+    middleware = ResilienceMiddleware(["test-mcp-tool"])
+
+    def handler(request) -> None:
+        raise RuntimeError("local failure")
+
+    with pytest.raises(RuntimeError, match="local failure"):
+        middleware.wrap_tool_call(_tool_request("read_tool_output"), handler)
+    assert "mcp:read_tool_output" not in breakers
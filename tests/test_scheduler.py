@@ -0,0 +1,228 @@
+import asyncio
+
+import pytest
+from app import scheduler as scheduler_module
+from app.scheduler import (
+    BULK,
+    DEFAULT,
+    INTERACTIVE,
+    FairScheduler,
+    ShedError,
+    Ticket,
+    classify,
+)
+
+
+def _granted(ticket: Ticket) -> bool:
+    return ticket.granted.done() and ticket.granted.exception() is None
+
+
+def _shed(ticket: Ticket) -> bool:
+    return ticket.granted.done() and isinstance(ticket.granted.exception(), ShedError)
+
+
+async def _hold(scheduler: FairScheduler, ticket: Ticket, done: asyncio.Event) -> None:
+    async with scheduler.run(ticket):
+        await done.wait()
+
+
+# ── classify ───────────────────────────────────────────────────────────────────
+
+
+@pytest.mark.parametrize(
+    ("tenant", "requested", "expected"),
+    [
+        ("unknown", None, DEFAULT),
+        ("unknown", INTERACTIVE, DEFAULT),  # unconfigured ids cannot self-promote
+        ("unknown", BULK, BULK),
+        ("web-ui", None, DEFAULT),
+        ("web-ui", INTERACTIVE, INTERACTIVE),
+        ("batch-api", INTERACTIVE, BULK),
+        ("batch-api", "nonsense", BULK),
+    ],
+)
+def test_classify(tenant: str, requested: str | None, expected: str) -> None:
+    priorities = {"web-ui": INTERACTIVE, "batch-api": BULK}
+    assert classify(tenant, requested, priorities) == expected
+
+
+# ── Admission ──────────────────────────────────────────────────────────────────
+
+
+def test_runs_wait_for_a_free_slot() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(2, 8, reserved_slots=0)
+        first = scheduler.submit("a", DEFAULT)
+        second = scheduler.submit("b", DEFAULT)
+        third = scheduler.submit("c", DEFAULT)
+        assert _granted(first) and _granted(second)
+        assert not third.granted.done()
+        assert scheduler.metrics()["queued"] == 1
+
+        done = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, first, done))
+        await asyncio.sleep(0)
+        done.set()
+        await holder
+        assert _granted(third)
+        assert scheduler.metrics()["running"] == 2
+
+    asyncio.run(main())
+
+
+def test_queued_runs_start_in_start_tag_order() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(1, 64, reserved_slots=0)
+        holder = scheduler.submit("x", DEFAULT)
+        bulk = [scheduler.submit("batch", BULK, sheddable=False) for _ in range(3)]
+        interactive = scheduler.submit("ui", INTERACTIVE)
+
+        order: list[Ticket] = []
+        for ticket in [*bulk, interactive]:
+            ticket.granted.add_done_callback(lambda _, t=ticket: order.append(t))
+
+        done = asyncio.Event()
+        done.set()
+        current = holder
+        for _ in range(4):
+            await _hold(scheduler, current, done)
+            await asyncio.sleep(0)
+            current = order[-1]
+
+        # Bulk tags are spaced 1 apart, interactive ones 1/8: the interactive
+        # run overtakes every bulk run queued behind the first.
+        assert order == [bulk[0], interactive, bulk[1], bulk[2]]
+
+    asyncio.run(main())
+
+
+def test_reserved_slots_are_kept_for_interactive_runs() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(2, 8, reserved_slots=1)
+        first = scheduler.submit("a", DEFAULT)
+        second = scheduler.submit("a", BULK, sheddable=False)
+        ui = scheduler.submit("ui", INTERACTIVE)
+        assert _granted(first)
+        assert not second.granted.done()
+        assert _granted(ui)
+
+    asyncio.run(main())
+
+
+# ── Shedding ───────────────────────────────────────────────────────────────────
+
+
+def test_heavy_tenant_cannot_shed_interactive_requests() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(2, 8)
+        admitted, shed = 0, 0
+        for _ in range(10):
+            try:
+                scheduler.submit("heavy", classify("heavy", None, {}))
+                admitted += 1
+            except ShedError:
+                shed += 1
+        assert shed > 0
+        assert scheduler.metrics()["tenants"]["heavy"]["queued"] == 2
+
+        assert not scheduler.would_shed("ui", INTERACTIVE)
+        assert _granted(scheduler.submit("ui", INTERACTIVE))
+
+    asyncio.run(main())
+
+
+def test_higher_priority_evicts_queued_lower_priority_run() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(1, 2, max_queued_per_tenant=10, reserved_slots=0)
+        scheduler.submit("ui", INTERACTIVE)
+        bulk = scheduler.submit("batch", BULK)
+        with pytest.raises(ShedError):
+            scheduler.submit("batch", BULK)  # bulk may only fill half the queue
+        assert scheduler.would_shed("batch", BULK)
+
+        scheduler.submit("ui", INTERACTIVE)
+        assert not bulk.granted.done()
+        assert not scheduler.would_shed("ui", INTERACTIVE)
+        scheduler.submit("ui", INTERACTIVE)
+        assert _shed(bulk)
+        assert scheduler.metrics()["tenants"]["batch"]["shed"] == 2
+
+    asyncio.run(main())
+
+
+def test_same_priority_evicts_from_largest_backlog() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(1, 4, max_queued_per_tenant=4, reserved_slots=0)
+        scheduler.submit("x", DEFAULT)
+        heavy = [scheduler.submit("heavy", DEFAULT) for _ in range(4)]
+        light = scheduler.submit("light", DEFAULT)
+        assert _shed(heavy[-1])
+        assert not any(t.granted.done() for t in heavy[:-1])
+        assert light.queued
+
+    asyncio.run(main())
+
+
+def test_background_jobs_are_never_shed() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(1, 2, reserved_slots=0)
+        jobs = [scheduler.submit("jobs", BULK, sheddable=False) for _ in range(5)]
+        # Queued jobs neither count against the queue limits nor get evicted.
+        ui = [scheduler.submit(f"ui-{i}", INTERACTIVE) for i in range(2)]
+        assert not any(_shed(t) for t in jobs)
+        assert all(t.queued for t in ui)
+
+    asyncio.run(main())
+
+
+# ── Cancellation ───────────────────────────────────────────────────────────────
+
+
+def test_cancelled_runs_give_back_their_place() -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(1, 8, reserved_slots=0)
+        running = scheduler.submit("a", DEFAULT)
+        waiting = scheduler.submit("b", DEFAULT)
+        after = scheduler.submit("c", DEFAULT)
+
+        never = asyncio.Event()
+        waiter = asyncio.create_task(_hold(scheduler, waiting, never))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not waiting.queued
+        assert scheduler.metrics()["queued"] == 1
+
+        holder = asyncio.create_task(_hold(scheduler, running, never))
+        await asyncio.sleep(0)
+        holder.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await holder
+        assert _granted(after)
+        assert not waiting.granted.done()
+        assert scheduler.metrics()["running"] == 1
+
+    asyncio.run(main())
+
+
+# ── Housekeeping ───────────────────────────────────────────────────────────────
+
+
+def test_idle_tenants_and_stale_flows_are_swept(monkeypatch) -> None:
+    async def main() -> None:
+        scheduler = FairScheduler(1, 8, reserved_slots=0)
+        done = asyncio.Event()
+        done.set()
+        for tenant in ("a", "b", "b", "b"):
+            await _hold(scheduler, scheduler.submit(tenant, DEFAULT), done)
+        assert len(scheduler.metrics()["tenants"]) == 2
+
+        monkeypatch.setattr(scheduler_module, "_STATS_TTL_SECONDS", 0.0)
+        scheduler._next_sweep = 0.0
+        await _hold(scheduler, scheduler.submit("d", DEFAULT), done)
+        assert list(scheduler.metrics()["tenants"]) == ["d"]
+        # "a" finished behind virtual time; "b"'s last run still sets its tags.
+        assert set(scheduler._last_finish) == {("b", DEFAULT), ("d", DEFAULT)}
+
+    asyncio.run(main())
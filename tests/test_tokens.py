@@ -0,0 +1,172 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from app import agent, tokens
+from app.tokens import (
+    BudgetExceededError,
+    ClientBudgets,
+    MessageTokenCounter,
+    TokenUsage,
+    split_tokens,
+)
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.tools import tool
+
+
+class _WordTokenizer:
+    """One token per whitespace-separated word, with character offsets."""
+
+    def encode(self, text: str, add_special_tokens: bool = False) -> SimpleNamespace:
+        offsets = [m.span() for m in re.finditer(r"\S+", text)]
+        return SimpleNamespace(ids=offsets, offsets=offsets)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(tokens, "time", clock)
+    return clock
+
+
+# ── Splitting ──────────────────────────────────────────────────────────────────
+
+
+@pytest.mark.parametrize(
+    ("text", "max_tokens", "chunks"),
+    [
+        ("", 3, []),
+        ("abcdefghij", 1, ["abcd", "efgh", "ij"]),
+        ("abcdefgh", 2, ["abcdefgh"]),
+        ("abcdefghi", 0, ["abcd", "efgh", "i"]),  # at least one token per chunk
+    ],
+)
+def test_split_tokens_estimate(estimated_tokens, text, max_tokens, chunks) -> None:
+    assert split_tokens(text, max_tokens) == chunks
+
+
+@pytest.mark.parametrize(
+    ("text", "max_tokens", "chunks"),
+    [
+        ("aa bb cc dd e", 2, ["aa bb", " cc dd", " e"]),
+        ("aa bb cc dd", 2, ["aa bb", " cc dd"]),  # no empty trailing chunk
+        ("aa bb", 5, ["aa bb"]),
+        ("aa bb ", 1, ["aa", " bb "]),  # trailing text joins the last chunk
+    ],
+)
+def test_split_tokens_cuts_at_token_ends(monkeypatch, text, max_tokens, chunks) -> None:
+    monkeypatch.setattr(tokens, "load_tokenizer", _WordTokenizer)
+    assert split_tokens(text, max_tokens) == chunks
+    assert "".join(chunks) == text
+
+
+def test_message_counter_only_counts_new_messages(
+    estimated_tokens, monkeypatch
+) -> None:
+    counted = []
+    count_message_tokens = tokens.count_message_tokens
+
+    def spy(messages):
+        counted.extend(messages)
+        return count_message_tokens(messages)
+
+    monkeypatch.setattr(tokens, "count_message_tokens", spy)
+    system = SystemMessage("be brief")
+    question = HumanMessage("what is 6 x 7?", id="m1")
+    reply = AIMessage("42", id="m2")
+    counter = MessageTokenCounter()
+
+    first = counter.count([system, question])
+    second = counter.count([system, question, reply])
+    assert second - first == count_message_tokens([reply])
+    assert counted == [system, question, system, reply]
+
+
+# ── Budgets ────────────────────────────────────────────────────────────────────
+
+
+def test_client_budget_resets_after_the_window(clock) -> None:
+    budgets = ClientBudgets(limit=100, window=10.0)
+    assert budgets.charge("a", 60) == 40
+    assert budgets.charge("a", 50) == 0
+    assert budgets.remaining("a") == 0
+    assert budgets.remaining("b") == 100
+
+    clock.now = 9.9
+    assert budgets.remaining("a") == 0
+    clock.now = 10.0
+    assert budgets.remaining("a") == 100
+    assert budgets.charge("a", 30) == 70
+
+
+def test_client_budgets_sweep_ended_windows(clock) -> None:
+    budgets = ClientBudgets(limit=100, window=10.0)
+    budgets.charge("a", 1)
+    clock.now = 5.0
+    budgets.charge("b", 1)
+
+    clock.now = 12.0
+    budgets.charge("c", 1)
+    assert set(budgets._used) == {"b", "c"}
+
+    clock.now = 19.0  # "b" has ended, but the next sweep is only due at 22
+    budgets.charge("c", 1)
+    assert set(budgets._used) == {"b", "c"}
+
+
+def test_unlimited_client_budget() -> None:
+    budgets = ClientBudgets(limit=0)
+    assert budgets.charge("a", 10**9) is None
+    assert budgets.remaining("a") is None
+
+
+def test_charge_enforces_the_request_budget(monkeypatch) -> None:
+    monkeypatch.setattr(tokens, "TOKEN_BUDGET_PER_REQUEST", 100)
+    monkeypatch.setattr(agent, "client_budgets", ClientBudgets(limit=0))
+    usage = TokenUsage(prompt_tokens=90)
+    agent._charge(usage, "a", 90)
+    assert usage.remaining() == 10
+
+    usage.completion_tokens = 10
+    with pytest.raises(BudgetExceededError, match="Request token budget"):
+        agent._charge(usage, "a", 10)
+
+
+def test_charge_enforces_the_client_budget(monkeypatch) -> None:
+    monkeypatch.setattr(agent, "client_budgets", ClientBudgets(limit=50))
+    usage = TokenUsage()
+    agent._charge(usage, "a", 49)
+    with pytest.raises(BudgetExceededError, match="Client token budget"):
+        agent._charge(usage, "a", 1)
+    agent._charge(usage, "b", 1)
+
+
+def test_run_stops_once_the_request_budget_is_spent(fake_model, monkeypatch) -> None:
+    @tool
+    def lookup(key: str) -> str:
+        """Look *key* up."""
+        return "x" * 400
+
+    monkeypatch.setattr(tokens, "TOKEN_BUDGET_PER_REQUEST", 300)
+    model = fake_model(*[("lookup", {"key": str(i)}) for i in range(10)], "done")
+
+    async def main() -> list[dict]:
+        return [event async for event in agent.run_agent_stream("q", [lookup])]
+
+    events = asyncio.run(main())
+    assert events[-1]["type"] == "error"
+    assert "Request token budget" in events[-1]["content"]
+    assert events[-1]["usage"]["total_tokens"] >= 300
+    assert len(model.calls) < 10
@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("langchain")
+
+from app import tokens
+from app.tokens import TokenUsage
+from app.trimming import ToolOutputTrimmer, read_tool_output
+from langchain_core.messages import ToolMessage
+
+
+def _tool_message(content: str, name: str = "search") -> ToolMessage:
+    return ToolMessage(content=content, name=name, tool_call_id="call-1")
+
+
+@pytest.mark.parametrize(
+    ("budget", "used", "limit"),
+    [
+        (0, 5000, 2000),  # no request budget: the configured maximum
+        (10_000, 0, 2000),
+        (10_000, 6000, 1000),  # a quarter of what is left
+        (10_000, 9500, 200),  # never below the floor
+        (10_000, 20_000, 200),
+    ],
+)
+def test_limit_shrinks_with_the_remaining_budget(
+    monkeypatch, budget, used, limit
+) -> None:
+    monkeypatch.setattr(tokens, "TOKEN_BUDGET_PER_REQUEST", budget)
+    trimmer = ToolOutputTrimmer(TokenUsage(prompt_tokens=used), max_tokens=2000)
+    assert trimmer._limit() == limit
+
+
+def test_short_outputs_are_left_alone(estimated_tokens) -> None:
+    trimmer = ToolOutputTrimmer(max_tokens=100)
+    message = _tool_message("x" * 400)
+    assert trimmer.trim(message).content == "x" * 400
+
+
+def test_long_outputs_are_paged_from_one(estimated_tokens) -> None:
+    trimmer = ToolOutputTrimmer(max_tokens=100, page_tokens=50)
+    text = "".join(f"{i:04d}" for i in range(250))  # 1000 chars, 250 tokens
+    content = trimmer.trim(_tool_message(text)).content
+
+    assert content.startswith(text[:200])
+    assert "[Page 1/5 shown" in content
+    assert "page=2..5" in content
+    ref = content.split("ref='")[1].split("'")[0]
+
+    pages = [read_tool_output.invoke({"ref": ref, "page": p}) for p in range(1, 6)]
+    assert pages[1] == f"[Page 2/5 of '{ref}']\n{text[200:400]}"
+    assert "".join(page.split("\n", 1)[1] for page in pages) == text
+    for page in (0, 6):
+        reply = read_tool_output.invoke({"ref": ref, "page": page})
+        assert "out of range" in reply
+        assert "pages 1..5" in reply
+
+
+def test_limit_caps_the_page_size(estimated_tokens, monkeypatch) -> None:
+    monkeypatch.setattr(tokens, "TOKEN_BUDGET_PER_REQUEST", 10_000)
+    usage = TokenUsage(prompt_tokens=9500)
+    trimmer = ToolOutputTrimmer(usage, max_tokens=2000, page_tokens=1000)
+    content = trimmer.trim(_tool_message("x" * 4000)).content
+    assert "[Page 1/5 shown" in content
+
+
+def test_spill_reader_output_is_never_trimmed(estimated_tokens) -> None:
+    trimmer = ToolOutputTrimmer(max_tokens=10)
+    message = _tool_message("y" * 400, name=read_tool_output.name)
+    assert trimmer.trim(message).content == "y" * 400
+
+
+def test_unknown_ref_is_a_miss() -> None:
+    reply = read_tool_output.invoke({"ref": "missing"})
+    assert reply.startswith("No stored output")